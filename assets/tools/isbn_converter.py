@@ -1,7 +1,46 @@
 from PyQt5.QtWidgets import QApplication, QWidget, QLabel, QPushButton, QVBoxLayout, QHBoxLayout, QLineEdit, QMessageBox, QTextEdit, QFrame
-from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QFileDialog, QPlainTextEdit
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
+import csv
+import os
 import sys
 
+try:
+    import isbn as isbn_lib
+except ImportError:
+    # Run as a script from assets/tools; the isbn module lives in the repo root.
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+    import isbn as isbn_lib
+from isbn import clean, is_valid_isbn13, isbn10_to_isbn13, isbn13_to_isbn10
+
+
+class BatchConvertThread(QThread):
+    # Converts a pasted list or a file of ISBNs (one per line) off the GUI
+    # thread, using the vectorized converter when numpy is available.
+    converted = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, lines=None, file_name=None, parent=None):
+        super().__init__(parent)
+        self.lines = lines
+        self.file_name = file_name
+
+    def run(self):
+        try:
+            lines = self.lines
+            if self.file_name:
+                with open(self.file_name, 'r', encoding='utf-8') as isbn_file:
+                    lines = isbn_file.read().splitlines()
+            lines = [line.strip() for line in lines if line.strip()]
+
+            if isbn_lib.has_numpy():
+                results = isbn_lib.swap_format_array(lines).tolist() if lines else []
+            else:
+                results = [isbn_lib.swap_format(line) or '' for line in lines]
+            self.converted.emit(list(zip(lines, results)))
+        except (IOError, ValueError) as e:
+            self.failed.emit(str(e))
+
 class ISBNConverter(QWidget):
     def __init__(self):
         super().__init__()
@@ -45,23 +84,53 @@ class ISBNConverter(QWidget):
         result_layout.addWidget(self.result_text)
         result_layout.addWidget(self.copy_button)
 
+        self.batch_input = QPlainTextEdit(self)
+        self.batch_input.setPlaceholderText("Paste ISBNs, one per line")
+
+        self.batch_convert_button = QPushButton("Convert List", self)
+        self.batch_convert_button.clicked.connect(self.convert_list)
+
+        self.load_file_button = QPushButton("Load File", self)
+        self.load_file_button.clicked.connect(self.convert_file)
+
+        self.save_results_button = QPushButton("Save Results", self)
+        self.save_results_button.clicked.connect(self.save_results)
+        self.save_results_button.setEnabled(False)
+
+        self.batch_output = QPlainTextEdit(self)
+        self.batch_output.setReadOnly(True)
+
+        self.batch_status = QLabel("", self)
+
+        batch_buttons = QHBoxLayout()
+        batch_buttons.addWidget(self.batch_convert_button)
+        batch_buttons.addWidget(self.load_file_button)
+        batch_buttons.addWidget(self.save_results_button)
+
         layout = QVBoxLayout()
         layout.addWidget(title_label)
         layout.addLayout(input_layout)
         layout.addLayout(result_layout)
+        layout.addWidget(self.batch_input)
+        layout.addLayout(batch_buttons)
+        layout.addWidget(self.batch_output)
+        layout.addWidget(self.batch_status)
 
         self.setLayout(layout)
 
+        self.batch_thread = None
+        self.batch_results = []
+
     def update_char_count(self):
         char_count = len(self.isbn_input.text())
         self.char_count_text.setText(str(char_count))
 
     def convert_isbn(self):
-        isbn = self.isbn_input.text().replace("-", "")
+        isbn = clean(self.isbn_input.text())
         if len(isbn) == 10:
-            converted_isbn = self.isbn10_to_isbn13(isbn)
+            converted_isbn = isbn10_to_isbn13(isbn)
         elif len(isbn) == 13:
-            converted_isbn = self.isbn13_to_isbn10(isbn)
+            converted_isbn = isbn13_to_isbn10(isbn)
         else:
             self.result_text.setDisabled(True)
             self.result_text.setText("Invalid ISBN length")
@@ -70,34 +139,54 @@ class ISBNConverter(QWidget):
         if converted_isbn:
             self.result_text.setDisabled(False)
             self.result_text.setText(f"{converted_isbn}")
+        elif is_valid_isbn13(isbn):
+            self.result_text.setDisabled(True)
+            self.result_text.setText("979 ISBNs have no ISBN-10")
         else:
             self.result_text.setDisabled(True)
             self.result_text.setText("Invalid ISBN format")
 
-    def isbn10_to_isbn13(self, isbn10):
-        if len(isbn10) != 10:
-            return None
-
-        isbn13 = '978' + isbn10[:-1]
-        check_digit = 0
-        for i, char in enumerate(isbn13):
-            check_digit += int(char) * (1 if i % 2 == 0 else 3)
-        check_digit = (10 - (check_digit % 10)) % 10
+    def convert_list(self):
+        self.start_batch(BatchConvertThread(lines=self.batch_input.toPlainText().splitlines()))
 
-        return isbn13 + str(check_digit)
+    def convert_file(self):
+        file_name, _ = QFileDialog.getOpenFileName(self, "Load ISBN List", "", "Text Files (*.txt *.csv);;All Files (*)")
+        if file_name:
+            self.start_batch(BatchConvertThread(file_name=file_name))
 
-    def isbn13_to_isbn10(self, isbn13):
-        if len(isbn13) != 13 or not isbn13.startswith('978'):
-            return None
-
-        isbn10 = isbn13[3:-1]
-        check_digit = 0
-        for i, char in enumerate(isbn10):
-            check_digit += int(char) * (10 - i)
-        check_digit = (11 - (check_digit % 11)) % 11
-        check_digit = 'X' if check_digit == 10 else str(check_digit)
-
-        return isbn10 + check_digit
+    def start_batch(self, thread):
+        if self.batch_thread and self.batch_thread.isRunning():
+            return
+        self.batch_thread = thread
+        self.batch_thread.converted.connect(self.show_batch_results)
+        self.batch_thread.failed.connect(lambda message: self.batch_status.setText(f"Error: {message}"))
+        self.batch_convert_button.setEnabled(False)
+        self.load_file_button.setEnabled(False)
+        self.batch_thread.finished.connect(lambda: self.batch_convert_button.setEnabled(True))
+        self.batch_thread.finished.connect(lambda: self.load_file_button.setEnabled(True))
+        self.batch_status.setText("Converting...")
+        self.batch_thread.start()
+
+    def show_batch_results(self, results):
+        self.batch_results = results
+        invalid = sum(1 for _, converted in results if not converted)
+        self.batch_output.setPlainText("\n".join(
+            f"{original} -> {converted or 'Invalid'}" for original, converted in results
+        ))
+        self.batch_status.setText(f"Converted {len(results) - invalid} of {len(results)} ISBNs")
+        self.save_results_button.setEnabled(bool(results))
+
+    def save_results(self):
+        file_name, _ = QFileDialog.getSaveFileName(self, "Save Results", "", "CSV Files (*.csv);;All Files (*)")
+        if file_name:
+            try:
+                with open(file_name, 'w', newline='', encoding='utf-8') as csvfile:
+                    writer = csv.writer(csvfile)
+                    writer.writerow(['input', 'converted'])
+                    writer.writerows(self.batch_results)
+                self.batch_status.setText("Results saved")
+            except IOError as e:
+                self.batch_status.setText(f"Error saving results: {e}")
 
     def copy_to_clipboard(self):
         clipboard = QApplication.clipboard()
@@ -0,0 +1,190 @@
+import argparse
+import csv
+import os
+import sys
+import time
+from datetime import datetime
+from multiprocessing import Pool, cpu_count
+
+import cv2
+
+from collection import CSV_FIELDNAMES, row_from_book
+from decoding import decode_barcodes
+from isbn import is_valid_isbn13
+
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff', '.webp'}
+VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mov', '.mkv', '.m4v', '.wmv', '.webm'}
+
+EMPTY_DETAILS = {
+    'Title': 'N/A',
+    'Author': 'N/A',
+    'Publisher': 'N/A',
+    'Edition': 'N/A',
+    'Description': 'N/A',
+    'Pages': 'N/A',
+    'Genre': 'N/A',
+    'Language': 'N/A'
+}
+
+
+def find_inputs(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def make_tasks(paths, frame_step, segment_frames):
+    # Images are one task each; videos are split into segments so that a long
+    # recording is spread over all workers instead of pinning one core.
+    for path in find_inputs(paths):
+        extension = os.path.splitext(path)[1].lower()
+        if extension in IMAGE_EXTENSIONS:
+            yield ('image', path, 0, 0, 1)
+        elif extension in VIDEO_EXTENSIONS:
+            cap = cv2.VideoCapture(path)
+            frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            cap.release()
+            if frame_count <= 0:
+                # Unknown length (some containers); scan it as one segment.
+                yield ('video', path, 0, -1, frame_step)
+                continue
+            for start in range(0, frame_count, segment_frames):
+                yield ('video', path, start, min(start + segment_frames, frame_count), frame_step)
+
+
+def decode_isbns(frame):
+    # Other EAN-13 codes (product barcodes, misreads) are not ISBNs.
+    codes = [barcode.data.decode('utf-8') for barcode in decode_barcodes(frame) if barcode.type == "EAN13"]
+    return [code for code in codes if is_valid_isbn13(code)]
+
+
+def scan_task(task):
+    kind, path, start, end, step = task
+    found = []
+    frames = 0
+
+    if kind == 'image':
+        frame = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if frame is None:
+            print(f"Error reading image: {path}", file=sys.stderr)
+            return path, found, frames
+        frames = 1
+        found.extend(decode_isbns(frame))
+        return path, found, frames
+
+    cap = cv2.VideoCapture(path)
+    if start:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    position = start
+    while end < 0 or position < end:
+        if (position - start) % step == 0:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames += 1
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            found.extend(decode_isbns(frame))
+        elif not cap.grab():
+            break
+        position += 1
+    cap.release()
+    return path, found, frames
+
+
+class ResultWriter:
+    # Streams one CSV row per new ISBN, in the schema of scanned_books.csv.
+    # With a resolver, ISBNs are buffered and resolved in batches first; an
+    # ISBN without details (not found, or the lookup failed) is still written
+    # with empty details so it can be looked up again later, unless
+    # `drop_missing` is set.
+    def __init__(self, csvfile, resolver=None, batch_size=50, drop_missing=False):
+        self.csvfile = csvfile
+        self.writer = csv.DictWriter(csvfile, fieldnames=CSV_FIELDNAMES)
+        self.writer.writeheader()
+        self.resolver = resolver
+        self.batch_size = batch_size
+        self.drop_missing = drop_missing
+        self.pending = []
+        self.written = 0
+        self.not_found = 0
+
+    def add(self, isbn):
+        if self.resolver is None:
+            self.write(isbn, EMPTY_DETAILS)
+            return
+        self.pending.append(isbn)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        results = self.resolver(self.pending)
+        for isbn in self.pending:
+            book_details = results.get(isbn)
+            if book_details:
+                self.write(isbn, book_details)
+                continue
+            self.not_found += 1
+            print(f"No book found for {isbn}", file=sys.stderr)
+            if not self.drop_missing:
+                self.write(isbn, EMPTY_DETAILS)
+        self.pending = []
+
+    def write(self, isbn, details):
+        self.writer.writerow(row_from_book({
+            'isbn': isbn,
+            'details': details,
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }))
+        self.csvfile.flush()
+        self.written += 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scan ISBN barcodes from image directories and video files without the GUI.")
+    parser.add_argument('inputs', nargs='+', help="image files, video files or directories")
+    parser.add_argument('-o', '--output', default='scanned_books_batch.csv', help="CSV file to write (default: %(default)s)")
+    parser.add_argument('-j', '--workers', type=int, default=cpu_count(), help="worker processes (default: all cores)")
+    parser.add_argument('--frame-step', type=int, default=1, help="decode every Nth video frame")
+    parser.add_argument('--segment-frames', type=int, default=300, help="video frames per work item")
+    parser.add_argument('--lookup', action='store_true', help="resolve book details for each ISBN")
+    parser.add_argument('--drop-missing', action='store_true', help="with --lookup, leave out ISBNs whose details were not found")
+    args = parser.parse_args(argv)
+
+    resolver = None
+    if args.lookup:
+        from book_api import get_books_details
+        resolver = get_books_details
+
+    started = time.perf_counter()
+    seen = set()
+    frames = 0
+    tasks = make_tasks(args.inputs, max(1, args.frame_step), max(1, args.segment_frames))
+
+    with open(args.output, 'w', newline='', encoding='utf-8') as csvfile:
+        results = ResultWriter(csvfile, resolver, drop_missing=args.drop_missing)
+        with Pool(processes=max(1, args.workers)) as pool:
+            for path, isbns, frame_count in pool.imap_unordered(scan_task, tasks):
+                frames += frame_count
+                for isbn in isbns:
+                    if isbn not in seen:
+                        seen.add(isbn)
+                        print(f"{isbn} ({path})")
+                        results.add(isbn)
+        results.flush()
+
+    elapsed = time.perf_counter() - started
+    print(f"Decoded {frames} frames in {elapsed:.1f}s ({frames / elapsed if elapsed else 0:.1f} frames/s), "
+          f"{len(seen)} unique ISBNs, {results.written} written to {args.output}"
+          + (f", {results.not_found} not found" if resolver else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from common import make_books, parse_sizes, write_results
+from collection import BookCollection, read_books_csv, write_books_csv
+from search_index import FACET_FIELDS, SEARCH_FIELDS
+from storage import JournaledStore, SQLiteStore
+
+
+# Time to save and load the collection with each storage backend, and to
+# import and export it as CSV, from a thousand to a million books. Loads and
+# imports go into a collection indexed like the window's, and include the
+# first search so deferred index merges are counted.
+
+
+def new_collection():
+    return BookCollection(search_fields=SEARCH_FIELDS, facet_fields=FACET_FIELDS)
+
+
+def timed(action):
+    started = time.perf_counter()
+    result = action()
+    return time.perf_counter() - started, result
+
+
+def sqlite_save(collection, path):
+    store = SQLiteStore(path, snapshot_path=path + '.csv')
+    store.load(BookCollection())
+    elapsed, _ = timed(lambda: store.rewrite(collection))
+    store.close()
+    return elapsed
+
+
+def sqlite_load(path):
+    store = SQLiteStore(path, snapshot_path=path + '.csv')
+    collection = new_collection()
+
+    def load():
+        store.load(collection)
+        collection.search("a")
+
+    elapsed, _ = timed(load)
+    store.close()
+    return elapsed, len(collection)
+
+
+def journal_save(collection, path):
+    store = JournaledStore(path, journal_path=path + '.journal')
+    store.load(BookCollection())
+    elapsed, _ = timed(lambda: store.rewrite(collection))
+    store.close()
+    return elapsed
+
+
+def journal_load(path):
+    store = JournaledStore(path, journal_path=path + '.journal')
+    collection = new_collection()
+
+    def load():
+        store.load(collection)
+        collection.search("a")
+
+    elapsed, _ = timed(load)
+    store.close()
+    return elapsed, len(collection)
+
+
+def csv_import(path):
+    # As the window does it: read every row, then add them.
+    collection = new_collection()
+
+    def load():
+        for book in list(read_books_csv(path)):
+            collection.add(book['isbn'], book['details'], book['timestamp'])
+        collection.search("a")
+
+    elapsed, _ = timed(load)
+    return elapsed, len(collection)
+
+
+def run(sizes, description_words=20, directory=None):
+    results = []
+    with tempfile.TemporaryDirectory(dir=directory) as directory:
+        for size in sizes:
+            collection = BookCollection()
+            for isbn, details in make_books(size, description_words=description_words):
+                collection.add(isbn, details, "2024-01-01 10:00:00")
+
+            database = os.path.join(directory, f"books_{size}.db")
+            snapshot = os.path.join(directory, f"books_{size}.csv")
+            export = os.path.join(directory, f"export_{size}.csv")
+
+            result = {'books': size}
+            result['export_seconds'], _ = timed(lambda: write_books_csv(export, collection))
+            result['import_seconds'], imported = csv_import(export)
+            result['sqlite_save_seconds'] = sqlite_save(collection, database)
+            result['sqlite_load_seconds'], loaded = sqlite_load(database)
+            result['journal_save_seconds'] = journal_save(collection, snapshot)
+            result['journal_load_seconds'], replayed = journal_load(snapshot)
+            if not imported == loaded == replayed == size:
+                raise RuntimeError(f"Expected {size} books, got {imported} imported, {loaded} loaded, {replayed} replayed")
+
+            result['sqlite_bytes'] = os.path.getsize(database)
+            result['csv_bytes'] = os.path.getsize(export)
+            results.append(result)
+
+            del collection
+            for name in os.listdir(directory):
+                os.remove(os.path.join(directory, name))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Collection save, load, import and export times.")
+    parser.add_argument('--sizes', default="1000,10000,100000,1000000", help="comma-separated collection sizes")
+    parser.add_argument('--description-words', type=int, default=20, help="words in each synthetic description")
+    parser.add_argument('--directory', help="where to write the temporary files (default: system temp)")
+    parser.add_argument('--json', help="also write the results to this JSON file ('-' for stdout)")
+    args = parser.parse_args(argv)
+
+    results = run(parse_sizes(args.sizes), args.description_words, args.directory)
+
+    columns = ('export', 'import', 'sqlite_save', 'sqlite_load', 'journal_save', 'journal_load')
+    print(f"{'books':>8} " + " ".join(f"{column + ' s':>14}" for column in columns) + f" {'db MB':>7}")
+    for row in results:
+        print(f"{row['books']:>8} " + " ".join(f"{row[column + '_seconds']:>14.2f}" for column in columns)
+              + f" {row['sqlite_bytes'] / 2 ** 20:>7.1f}")
+
+    if args.json:
+        write_results(args.json, 'collection_io', vars(args), results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
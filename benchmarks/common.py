@@ -0,0 +1,97 @@
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from isbn import isbn13_check_digit
+
+
+# Synthetic collections: titles and authors drawn from a Zipf-like word list,
+# so a few words are common and most are rare, as in a real catalog.
+WORDS = [f"{syllable}{suffix}" for syllable in ("ka", "lo", "mer", "sin", "tor", "vel", "dra", "pha", "quin", "zor")
+         for suffix in ("a", "en", "is", "oth", "um", "ar", "ion", "ely", "ast", "ine", "ow", "ix")]
+GENRES = ["Fiction", "History", "Science", "Poetry", "Biography", "Travel", "Cooking", "Art", "Law", "N/A"]
+
+
+def make_isbn(number, prefix="978"):
+    first12 = f"{prefix}{number:09d}"
+    return first12 + isbn13_check_digit(first12)
+
+
+def make_books(count, seed=0, description_words=0):
+    # Yields (isbn, details) pairs with valid, sequential ISBN-13s.
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(len(WORDS))]
+    publishers = [f"{rng.choice(WORDS).title()} Press" for _ in range(200)]
+    authors = [f"{rng.choice(WORDS).title()} {rng.choice(WORDS).title()}" for _ in range(max(10, count // 20))]
+    for number in range(count):
+        description = " ".join(rng.choices(WORDS, k=description_words)).capitalize() + "." if description_words else 'N/A'
+        yield make_isbn(number), {
+            'Title': " ".join(rng.choices(WORDS, weights, k=rng.randint(2, 6))).title(),
+            'Author': rng.choice(authors),
+            'Publisher': rng.choice(publishers),
+            'Edition': str(rng.randint(1950, 2024)),
+            'Description': description,
+            'Pages': str(rng.randint(50, 900)),
+            'Genre': rng.choice(GENRES),
+            'Language': rng.choice(('en', 'en', 'en', 'de', 'fr'))
+        }
+
+
+def parse_sizes(text):
+    return [int(float(size)) for size in text.split(',') if size]
+
+
+def environment():
+    # Enough context to compare results across versions and machines.
+    versions = {'python': platform.python_version()}
+    for module in ('numpy', 'cv2', 'pyzbar', 'zxingcpp', 'requests', 'PyQt5.QtCore'):
+        try:
+            imported = __import__(module, fromlist=['_'])
+        except ImportError:
+            continue
+        versions[module] = getattr(imported, '__version__', getattr(imported, 'QT_VERSION_STR', 'unknown'))
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPO_ROOT, capture_output=True, text=True, timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ''
+
+    return {
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'commit': commit or None,
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpus': os.cpu_count(),
+        'versions': versions
+    }
+
+
+def write_results(path, benchmark, parameters, results):
+    # One JSON document per run: what ran, where, with which settings.
+    document = {
+        'benchmark': benchmark,
+        'environment': environment(),
+        'parameters': parameters,
+        'results': results
+    }
+    if path == '-':
+        json.dump(document, sys.stdout, indent=1)
+        print()
+        return document
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as output:
+        json.dump(document, output, indent=1)
+    print(f"Results written to {path}")
+    return document
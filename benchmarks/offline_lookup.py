@@ -0,0 +1,93 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from common import make_books, make_isbn, parse_sizes, write_results
+from collection import write_books_csv
+from offline_index import OfflineIndex, build_index
+
+
+# Ingest time and lookup latency of the offline index against its size. The
+# input is a CSV export of a synthetic collection. The build is traced to
+# show its peak memory stays bounded by the run size, which slows it down
+# several times; "open" memory is what opening the index allocates (the
+# fence keys), not the file itself.
+
+
+def run(sizes, lookups=20000, description_words=20, directory=None):
+    results = []
+    with tempfile.TemporaryDirectory(dir=directory) as directory:
+        for size in sizes:
+            export = os.path.join(directory, f"export_{size}.csv")
+            path = os.path.join(directory, f"index_{size}.bin")
+            write_books_csv(export, (
+                {'isbn': isbn, 'details': details, 'timestamp': "2024-01-01 10:00:00"}
+                for isbn, details in make_books(size, description_words=description_words)
+            ))
+
+            tracemalloc.start()
+            started = time.perf_counter()
+            _, count = build_index([export], path)
+            build = time.perf_counter() - started
+            _, build_peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            tracemalloc.start()
+            index = OfflineIndex(path)
+            opened, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            rng = random.Random(0)
+            hits = [make_isbn(rng.randrange(size)) for _ in range(lookups)]
+            misses = [make_isbn(rng.randrange(size), prefix="979") for _ in range(lookups)]
+            timings = {}
+            for name, isbns in (('hit', hits), ('miss', misses)):
+                started = time.perf_counter()
+                for isbn in isbns:
+                    index.get(isbn)
+                timings[name] = (time.perf_counter() - started) / lookups
+            index.close()
+
+            results.append({
+                'books': size,
+                'indexed': count,
+                'build_seconds': build,
+                'build_peak_bytes': build_peak,
+                'records_per_second': size / build if build else 0.0,
+                'index_bytes': os.path.getsize(path),
+                'open_bytes': opened,
+                'hit_seconds': timings['hit'],
+                'miss_seconds': timings['miss']
+            })
+            os.remove(export)
+            os.remove(path)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline index ingest and lookup times.")
+    parser.add_argument('--sizes', default="10000,100000,1000000", help="comma-separated numbers of books")
+    parser.add_argument('--lookups', type=int, default=20000, help="lookups timed per size")
+    parser.add_argument('--directory', help="where to write the temporary files (default: system temp)")
+    parser.add_argument('--json', help="also write the results to this JSON file ('-' for stdout)")
+    args = parser.parse_args(argv)
+
+    results = run(parse_sizes(args.sizes), args.lookups, directory=args.directory)
+
+    print(f"{'books':>8} {'build s':>8} {'records/s':>10} {'peak MB':>8} {'index MB':>9} {'open KB':>8} {'hit us':>7} {'miss us':>8}")
+    for row in results:
+        print(f"{row['books']:>8} {row['build_seconds']:>8.1f} {row['records_per_second']:>10.0f} "
+              f"{row['build_peak_bytes'] / 2 ** 20:>8.1f} {row['index_bytes'] / 2 ** 20:>9.1f} {row['open_bytes'] / 1024:>8.0f} "
+              f"{row['hit_seconds'] * 1e6:>7.1f} {row['miss_seconds'] * 1e6:>8.1f}")
+
+    if args.json:
+        write_results(args.json, 'offline_lookup', vars(args), results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
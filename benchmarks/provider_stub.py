@@ -0,0 +1,291 @@
+import argparse
+import hashlib
+import json
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from common import GENRES, WORDS, make_isbn, write_results
+
+
+# A local HTTP server answering like the Google Books volumes API and the
+# Open Library books API, with configurable latency, failures (HTTP 503) and
+# unknown ISBNs, so get_book_details and its lookup modes can be measured
+# without the network. Books are derived from a hash of the ISBN, so repeated
+# runs see the same answers.
+
+
+class ProviderBehaviour:
+    def __init__(self, latency=0.1, jitter=0.05, failure_rate=0.0, not_found_rate=0.1):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.not_found_rate = not_found_rate
+
+    @classmethod
+    def parse(cls, text):
+        # "latency,jitter,failure_rate,not_found_rate", any suffix omitted.
+        return cls(*(float(value) for value in text.split(',') if value))
+
+    def to_dict(self):
+        return dict(vars(self))
+
+
+def _fraction(isbn, salt):
+    digest = hashlib.blake2b(f"{salt}:{isbn}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') / 2 ** 64
+
+
+def fake_book(isbn):
+    rng = random.Random(isbn)
+    return {
+        'title': " ".join(rng.choices(WORDS, k=rng.randint(2, 5))).title(),
+        'author': f"{rng.choice(WORDS).title()} {rng.choice(WORDS).title()}",
+        'publisher': f"{rng.choice(WORDS).title()} Press",
+        'date': str(rng.randint(1950, 2024)),
+        'pages': rng.randint(50, 900),
+        'genre': rng.choice(GENRES[:-1]),
+        'description': " ".join(rng.choices(WORDS, k=30)).capitalize() + "."
+    }
+
+
+def google_volumes(isbn):
+    book = fake_book(isbn)
+    return {
+        'totalItems': 1,
+        'items': [{'volumeInfo': {
+            'title': book['title'],
+            'authors': [book['author']],
+            'publisher': book['publisher'],
+            'publishedDate': book['date'],
+            'description': book['description'],
+            'pageCount': book['pages'],
+            'categories': [book['genre']],
+            'language': 'en',
+            'industryIdentifiers': [{'type': 'ISBN_13', 'identifier': isbn}]
+        }}]
+    }
+
+
+def open_library_book(isbn):
+    book = fake_book(isbn)
+    return {
+        'title': book['title'],
+        'authors': [{'name': book['author']}],
+        'publishers': [{'name': book['publisher']}],
+        'publish_date': book['date'],
+        'notes': book['description'],
+        'number_of_pages': book['pages'],
+        'subjects': [{'name': book['genre']}],
+        'languages': [{'key': '/languages/eng'}]
+    }
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        if url.path == '/books/v1/volumes':
+            provider = 'google'
+            isbns = [query.get('q', [''])[0].replace('isbn:', '')]
+        elif url.path == '/api/books':
+            provider = 'openlibrary'
+            isbns = [key.replace('ISBN:', '') for key in query.get('bibkeys', [''])[0].split(',') if key]
+        else:
+            self.send_error(404)
+            return
+
+        server = self.server
+        behaviour = server.behaviours[provider]
+        with server.lock:
+            delay = max(0.0, server.rng.gauss(behaviour.latency, behaviour.jitter))
+            failed = server.rng.random() < behaviour.failure_rate
+            server.requests[provider] += 1
+        time.sleep(delay)
+        if failed:
+            self.send_error(503)
+            return
+
+        # Whether a book is known is fixed per ISBN and provider.
+        found = [isbn for isbn in isbns if _fraction(isbn, provider) >= behaviour.not_found_rate]
+        if provider == 'google':
+            data = google_volumes(found[0]) if found else {'totalItems': 0}
+        else:
+            data = {f"ISBN:{isbn}": open_library_book(isbn) for isbn in found}
+
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ProviderStub:
+    # Both provider APIs on one loopback port, served from a daemon thread.
+    def __init__(self, google=None, openlibrary=None, port=0, seed=0, host='127.0.0.1'):
+        self.server = ThreadingHTTPServer((host, port), _StubHandler)
+        self.server.daemon_threads = True
+        self.server.behaviours = {
+            'google': google or ProviderBehaviour(),
+            'openlibrary': openlibrary or ProviderBehaviour()
+        }
+        self.server.rng = random.Random(seed)
+        self.server.lock = threading.Lock()
+        self.server.requests = {'google': 0, 'openlibrary': 0}
+        self.thread = threading.Thread(target=self.server.serve_forever, name="provider-stub", daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def requests(self):
+        with self.server.lock:
+            return dict(self.server.requests)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def percentiles(values):
+    ordered = sorted(values)
+    if not ordered:
+        return {'p50': 0.0, 'p95': 0.0, 'p99': 0.0}
+    return {f"p{q}": ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))] for q in (50, 95, 99)}
+
+
+def run(stub, modes, lookups, concurrency=4, retries=2, batch=True, rate_limited=False):
+    import book_api
+
+    # Without the providers' own rate limits unless asked for, so the figures
+    # are the lookup path's and not the quota's.
+    rate = None if rate_limited else 0
+    providers = [
+        book_api.GoogleBooksProvider(base_url=stub.base_url, retries=retries, backoff=0.05, requests_per_second=rate),
+        book_api.OpenLibraryProvider(base_url=stub.base_url, retries=retries, backoff=0.05, requests_per_second=rate)
+    ]
+    original = book_api.PROVIDERS
+    book_api.PROVIDERS = providers
+    results = []
+    try:
+        for offset, mode in enumerate(modes):
+            # Fresh ISBNs per mode, so nothing is shared through connection state.
+            isbns = [make_isbn(number, prefix="979") for number in range(offset * lookups, (offset + 1) * lookups)]
+            before = stub.requests
+
+            def lookup(isbn):
+                started = time.perf_counter()
+                found = book_api.get_book_details(isbn, use_cache=False, mode=mode) is not None
+                return time.perf_counter() - started, found
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                outcomes = list(executor.map(lookup, isbns))
+            elapsed = time.perf_counter() - started
+
+            after = stub.requests
+            result = {'mode': mode, 'lookups': lookups, 'seconds': elapsed}
+            result.update(_outcome_stats(outcomes, elapsed))
+            result['requests'] = {provider: after[provider] - before[provider] for provider in after}
+            results.append(result)
+
+        if batch:
+            isbns = [make_isbn(number, prefix="979") for number in range(len(modes) * lookups, (len(modes) + 1) * lookups)]
+            before = stub.requests
+            started = time.perf_counter()
+            found = book_api.get_books_details(isbns, use_cache=False, max_workers=concurrency)
+            elapsed = time.perf_counter() - started
+            after = stub.requests
+            results.append({
+                'mode': 'batch',
+                'lookups': lookups,
+                'seconds': elapsed,
+                'found_rate': sum(1 for details in found.values() if details) / lookups,
+                'lookups_per_second': lookups / elapsed if elapsed else 0.0,
+                'requests': {provider: after[provider] - before[provider] for provider in after}
+            })
+    finally:
+        book_api.PROVIDERS = original
+        for provider in providers:
+            provider.close()
+    return results
+
+
+def _outcome_stats(outcomes, elapsed):
+    latencies = [latency for latency, _ in outcomes]
+    stats = {
+        'found_rate': sum(found for _, found in outcomes) / len(outcomes) if outcomes else 0.0,
+        'lookups_per_second': len(outcomes) / elapsed if elapsed else 0.0,
+        'mean': sum(latencies) / len(latencies) if latencies else 0.0
+    }
+    stats.update(percentiles(latencies))
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lookup latency against a local stub of the provider APIs.")
+    parser.add_argument('command', nargs='?', choices=('bench', 'serve'), default='bench',
+                        help="run the benchmark, or only serve the stub until interrupted")
+    parser.add_argument('--google', default="0.15,0.05,0.02,0.2",
+                        help="Google Books latency,jitter,failure_rate,not_found_rate (seconds and fractions)")
+    parser.add_argument('--openlibrary', default="0.3,0.15,0.05,0.1",
+                        help="Open Library latency,jitter,failure_rate,not_found_rate")
+    parser.add_argument('--port', type=int, default=0, help="port to serve on (default: any free port)")
+    parser.add_argument('--modes', default="sequential,parallel,hedged", help="comma-separated lookup modes")
+    parser.add_argument('--lookups', type=int, default=100, help="lookups per mode")
+    parser.add_argument('--concurrency', type=int, default=4, help="lookups in flight at once")
+    parser.add_argument('--retries', type=int, default=2, help="HTTP retries per provider request")
+    parser.add_argument('--rate-limited', action='store_true', help="keep the providers' request rate limits")
+    parser.add_argument('--seed', type=int, default=0, help="seed for latency and failure injection")
+    parser.add_argument('--json', help="also write the results to this JSON file ('-' for stdout)")
+    args = parser.parse_args(argv)
+
+    stub = ProviderStub(ProviderBehaviour.parse(args.google), ProviderBehaviour.parse(args.openlibrary),
+                        port=args.port, seed=args.seed).start()
+    if args.command == 'serve':
+        print(f"Serving both provider APIs at {stub.base_url}")
+        try:
+            stub.thread.join()
+        except KeyboardInterrupt:
+            pass
+        stub.stop()
+        return 0
+
+    try:
+        results = run(stub, args.modes.split(','), args.lookups, args.concurrency, args.retries,
+                      rate_limited=args.rate_limited)
+    finally:
+        stub.stop()
+
+    print(f"{'mode':>10} {'lookups/s':>10} {'found':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'requests':>9}")
+    for row in results:
+        latency = "".join(f" {row[q] * 1000:>8.0f}" if q in row else f" {'-':>8}" for q in ('p50', 'p95', 'p99'))
+        print(f"{row['mode']:>10} {row['lookups_per_second']:>10.1f} {row['found_rate']:>6.0%}{latency} "
+              f"{sum(row['requests'].values()):>9}")
+
+    if args.json:
+        parameters = dict(vars(args))
+        parameters['google'] = ProviderBehaviour.parse(args.google).to_dict()
+        parameters['openlibrary'] = ProviderBehaviour.parse(args.openlibrary).to_dict()
+        write_results(args.json, 'provider_stub', parameters, results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
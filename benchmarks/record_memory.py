@@ -0,0 +1,118 @@
+import argparse
+import gc
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from common import make_books, parse_sizes, write_results
+from collection import BookCollection, CSV_FIELDNAMES, book_from_row
+from search_index import FACET_FIELDS, SEARCH_FIELDS
+from storage import SQLiteStore
+
+
+# Bytes per scanned book held in memory after loading a collection from the
+# SQLite store: the dict-of-dicts entries the collection used to keep, against
+# Book records with interned fields and descriptions left in the database,
+# and the records together with the search index, as the window loads them.
+
+
+def fill_database(path, count, description_words):
+    rng = random.Random(1)
+
+    def books():
+        for isbn, details in make_books(count, description_words=description_words):
+            yield {'isbn': isbn, 'details': details, 'timestamp': f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 10:00:00"}
+
+    store = SQLiteStore(path, snapshot_path=path + '.csv')
+    store.load(BookCollection())
+    store.rewrite(books())
+    store.close()
+
+
+def load_dicts(store):
+    # The previous in-memory layout: one dict per book holding a details dict.
+    books = {}
+    for row in store.conn.execute(f"SELECT {', '.join(CSV_FIELDNAMES)} FROM books ORDER BY rowid"):
+        book = book_from_row(dict(zip(CSV_FIELDNAMES, row)))
+        books[book['isbn']] = {'isbn': book['isbn'], 'details': book['details'], 'timestamp': book['timestamp']}
+    return books
+
+
+def load_records(store):
+    collection = BookCollection()
+    store.load(collection)
+    return collection
+
+
+def load_window_collection(store):
+    collection = BookCollection(search_fields=SEARCH_FIELDS, facet_fields=FACET_FIELDS)
+    store.load(collection)
+    # Applies the index's buffered merges, as the first search does.
+    collection.search("a")
+    return collection
+
+
+def measure(load, path):
+    store = SQLiteStore(path, snapshot_path=path + '.csv')
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    books = load(store)
+    elapsed = time.perf_counter() - started
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    count = len(books)
+    del books
+    store.close()
+    gc.collect()
+    return used / count, elapsed
+
+
+def run(sizes, description_words=60):
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            path = os.path.join(directory, f"books_{size}.db")
+            fill_database(path, size, description_words)
+            before, before_time = measure(load_dicts, path)
+            after, after_time = measure(load_records, path)
+            window, window_time = measure(load_window_collection, path)
+            results.append({
+                'books': size,
+                'dicts_bytes_per_book': before,
+                'records_bytes_per_book': after,
+                'window_bytes_per_book': window,
+                'dicts_load_seconds': before_time,
+                'records_load_seconds': after_time,
+                'window_load_seconds': window_time
+            })
+            os.remove(path)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Memory per book, dict entries against compact records.")
+    parser.add_argument('--sizes', default="10000,100000,1000000", help="comma-separated collection sizes")
+    parser.add_argument('--description-words', type=int, default=60, help="words in each synthetic description")
+    parser.add_argument('--json', help="also write the results to this JSON file ('-' for stdout)")
+    args = parser.parse_args(argv)
+
+    results = run(parse_sizes(args.sizes), args.description_words)
+
+    print(f"{'books':>8} {'dicts B/book':>13} {'records B/book':>15} {'saved':>6} {'window B/book':>14} "
+          f"{'dicts load s':>13} {'records load s':>15} {'window load s':>14}")
+    for row in results:
+        before, after = row['dicts_bytes_per_book'], row['records_bytes_per_book']
+        print(f"{row['books']:>8} {before:>13.0f} {after:>15.0f} {1 - after / before:>6.0%} {row['window_bytes_per_book']:>14.0f} "
+              f"{row['dicts_load_seconds']:>13.1f} {row['records_load_seconds']:>15.1f} {row['window_load_seconds']:>14.1f}")
+
+    if args.json:
+        write_results(args.json, 'record_memory', vars(args), results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+import argparse
+import os
+import sys
+import time
+
+import cv2
+
+from common import write_results
+from decoding import FrameDecoder, VariantDecoder
+from metrics import METRICS, summary
+from scan_events import ScanEventFilter
+
+
+# Replays recorded videos through the same per-frame path as the live
+# scanner - FrameDecoder, ScanEventFilter and, with --render, the preview
+# renderer used by update_frame - without a camera or a window. Event timing
+# follows the video's own clock, so results do not depend on replay speed.
+
+
+def make_renderer():
+    # The preview needs a QApplication for QPixmap; an offscreen one is
+    # enough and keeps the replay headless.
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication
+    from preview import PreviewRenderer
+
+    application = QApplication.instance() or QApplication([])
+    return application, PreviewRenderer()
+
+
+def replay(path, decoder, scan_filter, renderer=None, preview_size=(640, 480), max_frames=0):
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError(f"Cannot open video {path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+
+    timings = {'capture': 0.0, 'decode': 0.0, 'events': 0.0, 'render': 0.0}
+    events = []
+    frames = 0
+    barcodes = []
+    started = time.perf_counter()
+    while not max_frames or frames < max_frames:
+        step = time.perf_counter()
+        ok, frame = cap.read()
+        timings['capture'] += time.perf_counter() - step
+        if not ok:
+            break
+        METRICS.inc('frames_captured_total')
+
+        step = time.perf_counter()
+        barcodes = decoder.decode(frame)
+        timings['decode'] += time.perf_counter() - step
+
+        step = time.perf_counter()
+        isbns = [barcode.data.decode('utf-8') for barcode in barcodes if barcode.type == "EAN13"]
+        for event in scan_filter.update(isbns, now=frames / fps, fresh=not decoder.cached):
+            events.append({'frame': frames, 'isbn': event.isbn, 'status': event.status})
+        timings['events'] += time.perf_counter() - step
+
+        if renderer is not None:
+            step = time.perf_counter()
+            with METRICS.timer('render_seconds'):
+                renderer.render(frame, barcodes, *preview_size)
+            METRICS.inc('frames_rendered_total')
+            timings['render'] += time.perf_counter() - step
+        frames += 1
+    elapsed = time.perf_counter() - started
+    cap.release()
+
+    return {
+        'video': path,
+        'frames': frames,
+        'video_fps': fps,
+        'seconds': elapsed,
+        'frames_per_second': frames / elapsed if elapsed else 0.0,
+        'ms_per_frame': {stage: 1000 * total / frames if frames else 0.0 for stage, total in timings.items()},
+        'events': events,
+        'unique_isbns': sorted({event['isbn'] for event in events if event['status'] != "invalid"}),
+        'decoder': decoder.stats()
+    }
+
+
+def run(paths, render=False, variants=False, max_frames=0):
+    application = renderer = None
+    if render:
+        application, renderer = make_renderer()
+
+    results = []
+    for path in paths:
+        preprocessor = VariantDecoder() if variants else None
+        decoder = FrameDecoder(preprocessor=preprocessor)
+        result = replay(path, decoder, ScanEventFilter(), renderer, max_frames=max_frames)
+        if preprocessor is not None:
+            preprocessor.shutdown()
+        results.append(result)
+    return results, summary(METRICS)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay video files through the scan pipeline headlessly.")
+    parser.add_argument('videos', nargs='+', help="video files to replay")
+    parser.add_argument('--render', action='store_true', help="also render preview frames offscreen")
+    parser.add_argument('--variants', action='store_true', help="decode missed frames with preprocessing variants")
+    parser.add_argument('--max-frames', type=int, default=0, help="stop each video after this many frames")
+    parser.add_argument('--json', help="also write the results to this JSON file ('-' for stdout)")
+    args = parser.parse_args(argv)
+
+    results, pipeline = run(args.videos, args.render, args.variants, args.max_frames)
+
+    print(f"{'video':>30} {'frames':>7} {'fps':>7} {'decode ms':>10} {'render ms':>10} {'events':>7} {'isbns':>6}")
+    for row in results:
+        print(f"{os.path.basename(row['video'])[-30:]:>30} {row['frames']:>7} {row['frames_per_second']:>7.1f} "
+              f"{row['ms_per_frame']['decode']:>10.2f} {row['ms_per_frame']['render']:>10.2f} "
+              f"{len(row['events']):>7} {len(row['unique_isbns']):>6}")
+    print(f"Decode hit rate: {pipeline['decode_hit_rate']:.0%}")
+
+    if args.json:
+        write_results(args.json, 'replay_video', vars(args), {'videos': results, 'pipeline': pipeline})
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+import argparse
+import importlib
+import os
+import sys
+import time
+import traceback
+
+from common import parse_sizes, write_results
+
+
+# Runs every benchmark with settings small enough for a quick comparison
+# between commits and writes one combined JSON document. A benchmark whose
+# dependencies are not installed is recorded as skipped rather than failing
+# the whole run.
+
+RESULTS_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def search_latency(args):
+    return importlib.import_module('search_latency').run(parse_sizes(args.sizes), repeat=3)
+
+
+def record_memory(args):
+    return importlib.import_module('record_memory').run(parse_sizes(args.sizes))
+
+
+def collection_io(args):
+    return importlib.import_module('collection_io').run(parse_sizes(args.sizes))
+
+
+def offline_lookup(args):
+    return importlib.import_module('offline_lookup').run(parse_sizes(args.sizes), lookups=5000)
+
+
+def synthetic_frames(args):
+    return importlib.import_module('synthetic_frames').run(['640x480', '1280x720'], [0.0, 15.0], [0.0, 1.5], [0.0, 10.0], args.frames)
+
+
+def provider_stub(args):
+    module = importlib.import_module('provider_stub')
+    importlib.import_module('book_api')
+    stub = module.ProviderStub(
+        module.ProviderBehaviour(0.05, 0.02, 0.02, 0.2),
+        module.ProviderBehaviour(0.1, 0.05, 0.05, 0.1)
+    ).start()
+    try:
+        return module.run(stub, ['sequential', 'parallel', 'hedged'], args.lookups)
+    finally:
+        stub.stop()
+
+
+def replay_video(args):
+    if not args.videos:
+        raise LookupError("no videos given (--videos)")
+    results, pipeline = importlib.import_module('replay_video').run(args.videos, render=False)
+    return {'videos': results, 'pipeline': pipeline}
+
+
+BENCHMARKS = {
+    'search_latency': search_latency,
+    'record_memory': record_memory,
+    'collection_io': collection_io,
+    'offline_lookup': offline_lookup,
+    'synthetic_frames': synthetic_frames,
+    'provider_stub': provider_stub,
+    'replay_video': replay_video
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the benchmark suite and write one JSON file.")
+    parser.add_argument('--only', help="comma-separated benchmarks to run (default: all)")
+    parser.add_argument('--sizes', default="1000,10000,100000", help="collection sizes for the collection benchmarks")
+    parser.add_argument('--frames', type=int, default=10, help="frames per synthetic condition")
+    parser.add_argument('--lookups', type=int, default=40, help="lookups per provider stub mode")
+    parser.add_argument('--videos', nargs='*', default=[], help="video files for the replay benchmark")
+    parser.add_argument('--json', help="output file (default: benchmarks/results/<time>.json, '-' for stdout)")
+    args = parser.parse_args(argv)
+
+    names = args.only.split(',') if args.only else list(BENCHMARKS)
+    results = {}
+    for name in names:
+        print(f"Running {name}...")
+        started = time.perf_counter()
+        try:
+            result = {'status': 'ok', 'results': BENCHMARKS[name](args)}
+        except (ImportError, LookupError) as e:
+            print(f"Skipped {name}: {e}")
+            result = {'status': 'skipped', 'reason': str(e)}
+        except Exception as e:
+            traceback.print_exc()
+            result = {'status': 'error', 'reason': f"{type(e).__name__}: {e}"}
+        result['seconds'] = time.perf_counter() - started
+        results[name] = result
+
+    path = args.json or os.path.join(RESULTS_DIRECTORY, time.strftime('%Y%m%d-%H%M%S') + '.json')
+    write_results(path, 'suite', vars(args), results)
+    return 0 if all(result['status'] != 'error' for result in results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+import argparse
+import sys
+import time
+
+from common import WORDS, make_books, parse_sizes, write_results
+from collection import BookCollection
+from search_index import FACET_FIELDS, SEARCH_FIELDS
+
+
+QUERIES = [
+    ("isbn prefix", "97800001", None),
+    ("rare word", WORDS[-1][:4], None),
+    ("common word", WORDS[0], None),
+    ("two words", f"{WORDS[0]} {WORDS[5][:3]}", None),
+    ("word + genre", WORDS[3], {'Genre': 'History'}),
+    ("no match", "zzzz", None),
+]
+
+
+def time_query(collection, text, filters, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        results = collection.search(text, filters)
+        collection.facets(results)
+        best = min(best, time.perf_counter() - started)
+    return best, (len(collection) if results is None else len(results))
+
+
+def run(sizes, repeat=5):
+    results = []
+    for size in sizes:
+        collection = BookCollection(search_fields=SEARCH_FIELDS, facet_fields=FACET_FIELDS)
+        started = time.perf_counter()
+        for isbn, details in make_books(size):
+            collection.add(isbn, details)
+        collection.search("a")
+        build = time.perf_counter() - started
+
+        # Scans arriving and being deleted, each followed by a query.
+        started = time.perf_counter()
+        for isbn, details in make_books(20, seed=1):
+            isbn = '979' + isbn[3:]
+            collection.add(isbn, details)
+            collection.search(isbn)
+            collection.remove(isbn)
+            collection.search(isbn)
+        update = (time.perf_counter() - started) / 40
+
+        queries = {}
+        for name, text, filters in QUERIES:
+            elapsed, hits = time_query(collection, text, filters, repeat)
+            queries[name] = {'seconds': elapsed, 'matches': hits}
+        results.append({'books': size, 'build_seconds': build, 'update_seconds': update, 'queries': queries})
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search latency against collection size.")
+    parser.add_argument('--sizes', default="1000,10000,100000,500000", help="comma-separated collection sizes")
+    parser.add_argument('--repeat', type=int, default=5, help="runs per query (best is reported)")
+    parser.add_argument('--json', help="also write the results to this JSON file ('-' for stdout)")
+    args = parser.parse_args(argv)
+
+    results = run(parse_sizes(args.sizes), args.repeat)
+
+    # Each query column is "best latency (number of matches)".
+    print(f"{'books':>8} {'build s':>8} {'update ms':>10}  " + "  ".join(f"{name:>18}" for name, _, _ in QUERIES))
+    for row in results:
+        cells = [f"{query['seconds'] * 1000:.2f}ms ({query['matches']})".rjust(18) for query in row['queries'].values()]
+        print(f"{row['books']:>8} {row['build_seconds']:>8.1f} {row['update_seconds'] * 1000:>10.2f}  " + "  ".join(cells))
+
+    if args.json:
+        write_results(args.json, 'search_latency', vars(args), results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,370 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from metadata_cache import get_metadata_cache
+from metrics import METRICS
+from offline_index import get_offline_index
+
+
+# How get_book_details queries the providers:
+#   "sequential" - try each provider in order until one finds the book
+#   "parallel"   - query all providers at once and take the first good answer
+#   "hedged"     - start the next provider only if the previous one has not
+#                  answered within HEDGE_DELAY seconds
+LOOKUP_MODE = "hedged"
+HEDGE_DELAY = 0.4
+
+
+class ProviderError(Exception):
+    pass
+
+
+class TokenBucket:
+    # Allows `rate` requests per second on average and bursts of up to
+    # `capacity`. acquire() takes a token, sleeping until one is available,
+    # and returns the time it waited. Waiters reserve tokens in the order
+    # they ask, so concurrent lookups queue up instead of racing.
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+class BookProvider:
+    name = "Provider"
+    base_url = ""
+    timeout = (3.05, 5)
+    # Number of ISBNs fetch_many can resolve in a single request.
+    max_batch_size = 1
+    # Request rate limit (token bucket), or None for no limit.
+    requests_per_second = None
+    burst = 1
+
+    def __init__(self, timeout=None, retries=2, backoff=0.3, pool_size=8, base_url=None, requests_per_second=None):
+        if timeout is not None:
+            self.timeout = timeout
+        # Overridden to point a provider at a mirror or a local test server.
+        if base_url is not None:
+            self.base_url = base_url.rstrip("/")
+        if requests_per_second is not None:
+            self.requests_per_second = requests_per_second
+        # Shared by every lookup through this provider, interactive or queued,
+        # so together they stay under the provider's quota.
+        self.limiter = TokenBucket(self.requests_per_second, self.burst) if self.requests_per_second else None
+
+        # One keep-alive session per provider, so repeated lookups reuse the
+        # same TCP/TLS connections instead of handshaking every time. Server
+        # errors get a quick retry here; a 429 is raised as a ProviderError
+        # instead, so callers back off through their own limits rather than
+        # urllib3 sleeping for whatever Retry-After asks.
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=[500, 502, 503, 504],
+            allowed_methods=["GET"],
+            respect_retry_after_header=False
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get_json(self, URL):
+        if self.limiter:
+            METRICS.observe('rate_limit_wait_seconds', self.limiter.acquire(), provider=self.name)
+        started = time.perf_counter()
+        try:
+            Response = self.session.get(URL, timeout=self.timeout)
+            Response.raise_for_status()
+            return Response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            METRICS.inc('errors_total', stage='lookup', provider=self.name)
+            print(f"Error fetching book details from {self.name}: {e}")
+            raise ProviderError(str(e))
+        finally:
+            METRICS.observe('provider_request_seconds', time.perf_counter() - started, provider=self.name)
+
+    def fetch(self, ISBN):
+        raise NotImplementedError
+
+    def fetch_many(self, ISBNs):
+        results = {}
+        for ISBN in ISBNs:
+            book_details = self.fetch(ISBN)
+            if book_details:
+                results[ISBN] = book_details
+        return results
+
+    def close(self):
+        self.session.close()
+
+
+class GoogleBooksProvider(BookProvider):
+    name = "Google Books"
+    base_url = "https://www.googleapis.com"
+    timeout = (3.05, 5)
+    # Keyless requests share a small per-IP quota.
+    requests_per_second = 2.0
+    burst = 5
+
+    def fetch(self, ISBN):
+        URL = self.base_url + "/books/v1/volumes?q=isbn:" + str(ISBN)
+        BookData = self.get_json(URL)
+        if BookData["totalItems"] == 0:
+            return None
+
+        volume_info = BookData["items"][0]["volumeInfo"]
+        identifiers = volume_info.get("industryIdentifiers", [])
+        isbn_13 = None
+        for identifier in identifiers:
+            if identifier["type"] == "ISBN_13":
+                isbn_13 = identifier["identifier"]
+                break
+        if not isbn_13:
+            return None  # If no ISBN-13 is found, return None
+
+        title = volume_info.get("title", "N/A")
+        authors = volume_info.get("authors", ["N/A"])
+        author = authors[0] if authors else "N/A"
+        publisher = volume_info.get("publisher", "N/A")
+        publishedDate = volume_info.get("publishedDate", "N/A")
+        description = volume_info.get("description", "N/A")
+        pageCount = volume_info.get("pageCount", "N/A")
+        categories = volume_info.get("categories", ["N/A"])
+        category = categories[0] if categories else "N/A"
+        language = volume_info.get("language", "N/A")
+
+        book_details = {
+            "ISBN-13": isbn_13,
+            "Title": title,
+            "Author": author,
+            "Publisher": publisher,
+            "Edition": publishedDate,
+            "Description": description,
+            "Pages": pageCount,
+            "Genre": category,
+            "Language": language
+        }
+        return book_details
+
+
+class OpenLibraryProvider(BookProvider):
+    name = "Open Library"
+    base_url = "https://openlibrary.org"
+    timeout = (3.05, 8)
+    max_batch_size = 50
+    requests_per_second = 1.0
+    burst = 3
+
+    def fetch(self, ISBN):
+        return self.fetch_many([ISBN]).get(ISBN)
+
+    def fetch_many(self, ISBNs):
+        # The books API accepts a comma separated list of bibkeys, so a whole
+        # batch is resolved with one round trip.
+        bibkeys = ",".join(f"ISBN:{ISBN}" for ISBN in ISBNs)
+        URL = f"{self.base_url}/api/books?bibkeys={bibkeys}&format=json&jscmd=data"
+        BookData = self.get_json(URL)
+        if not BookData:
+            return {}
+
+        results = {}
+        for ISBN in ISBNs:
+            book_data = BookData.get(f"ISBN:{ISBN}", {})
+            if book_data:
+                results[ISBN] = self.parse(ISBN, book_data)
+        return results
+
+    def parse(self, ISBN, book_data):
+        isbn_13 = ISBN
+        title = book_data.get("title", "N/A")
+        authors = book_data.get("authors", [{"name": "N/A"}])
+        author = authors[0]["name"] if authors else "N/A"
+        publisher = book_data.get("publishers", [{"name": "N/A"}])[0]["name"]
+        publishedDate = book_data.get("publish_date", "N/A")
+        description = book_data.get("notes", "N/A")
+        pageCount = book_data.get("number_of_pages", "N/A")
+        categories = book_data.get("subjects", [{"name": "N/A"}])
+        category = categories[0]["name"] if categories else "N/A"
+        language = book_data.get("languages", [{"key": "/languages/eng"}])[0]["key"].split('/')[-1]
+
+        book_details = {
+            "ISBN-13": isbn_13,
+            "Title": title,
+            "Author": author,
+            "Publisher": publisher,
+            "Edition": publishedDate,
+            "Description": description,
+            "Pages": pageCount,
+            "Genre": category,
+            "Language": language
+        }
+        return book_details
+
+
+PROVIDERS = [GoogleBooksProvider(), OpenLibraryProvider()]
+
+_provider_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="provider")
+
+
+def query_providers(ISBN, providers=None, mode=None, hedge_delay=None):
+    # Returns (book_details, failed) where `failed` is True if any provider
+    # could not be reached, so callers can tell "not found" from "offline".
+    providers = list(providers if providers is not None else PROVIDERS)
+    mode = mode or LOOKUP_MODE
+    hedge_delay = HEDGE_DELAY if hedge_delay is None else hedge_delay
+
+    failed = False
+    remaining = list(providers)
+    pending = {}
+
+    def launch():
+        provider = remaining.pop(0)
+        pending[_provider_executor.submit(provider.fetch, ISBN)] = provider
+
+    launch()
+    if mode == "parallel":
+        while remaining:
+            launch()
+
+    while pending:
+        timeout = hedge_delay if mode == "hedged" and remaining else None
+        done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            provider = pending.pop(future)
+            try:
+                book_details = future.result()
+            except ProviderError:
+                failed = True
+                continue
+            except Exception as e:
+                METRICS.inc('errors_total', stage='lookup', provider=provider.name)
+                print(f"Error reading book details from {provider.name}: {e}")
+                continue
+            if book_details:
+                for other in pending:
+                    other.cancel()
+                return book_details, failed
+
+        # Hedge to the next provider when the current ones are slow, or fall
+        # through to it when they have all answered without a result.
+        if remaining and (not done or not pending):
+            launch()
+
+    return None, failed
+
+
+def get_book_details(ISBN, use_cache=True, mode=None):
+    return lookup_book_details(ISBN, use_cache, mode)[0]
+
+
+def lookup_book_details(ISBN, use_cache=True, mode=None):
+    # get_book_details, returning (book_details, failed) like query_providers
+    # so the scan queue can retry lookups that failed rather than found
+    # nothing. Local answers are never failures. With use_cache=False both
+    # local tiers, the offline index and the cache, are skipped.
+    if use_cache:
+        offline_index = get_offline_index()
+        book_details = offline_index.get(ISBN) if offline_index else None
+        if book_details:
+            return book_details, False
+
+    cache = get_metadata_cache() if use_cache else None
+    if cache:
+        hit, book_details = cache.get(ISBN)
+        if hit:
+            return book_details, False
+
+    with METRICS.timer('lookup_seconds'):
+        book_details, failed = query_providers(ISBN, mode=mode)
+
+    # A network error is not cached as "not found".
+    if cache:
+        if book_details:
+            cache.put(ISBN, book_details)
+            if book_details["ISBN-13"] != ISBN:
+                cache.put(book_details["ISBN-13"], book_details)
+        elif not failed:
+            cache.put(ISBN, None)
+
+    return book_details, failed
+
+
+def get_books_details(ISBNs, use_cache=True, max_workers=4, refresh=False):
+    # Bulk counterpart of get_book_details. Returns {ISBN: book_details or
+    # None}. Uncached ISBNs are grouped into batches sized for each provider,
+    # batch-capable providers first, and the batches run concurrently. With
+    # refresh=True every ISBN is fetched again, and the answers replace the
+    # cached ones so later lookups do not get the stale details back.
+    read_local = use_cache and not refresh
+    offline_index = get_offline_index() if read_local else None
+    cache = get_metadata_cache() if use_cache else None
+    results = {}
+    unresolved = []
+    for ISBN in dict.fromkeys(ISBNs):
+        book_details = offline_index.get(ISBN) if offline_index else None
+        if book_details:
+            results[ISBN] = book_details
+            continue
+        if cache and read_local:
+            hit, book_details = cache.get(ISBN)
+            if hit:
+                results[ISBN] = book_details
+                continue
+        unresolved.append(ISBN)
+
+    fetched = list(unresolved)
+    failed = set()
+    providers = sorted(PROVIDERS, key=lambda provider: -provider.max_batch_size)
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="batch") as executor:
+        for provider in providers:
+            if not unresolved:
+                break
+
+            size = provider.max_batch_size
+            batches = [unresolved[i:i + size] for i in range(0, len(unresolved), size)]
+            futures = {executor.submit(provider.fetch_many, batch): batch for batch in batches}
+            for future, batch in futures.items():
+                try:
+                    found = future.result()
+                except ProviderError:
+                    failed.update(batch)
+                    continue
+                except Exception as e:
+                    METRICS.inc('errors_total', stage='lookup', provider=provider.name)
+                    print(f"Error reading book details from {provider.name}: {e}")
+                    continue
+                results.update(found)
+
+            unresolved = [ISBN for ISBN in unresolved if ISBN not in results]
+
+    for ISBN in unresolved:
+        results[ISBN] = None
+
+    if cache:
+        for ISBN in fetched:
+            book_details = results[ISBN]
+            if book_details:
+                cache.put(ISBN, book_details)
+            elif ISBN not in failed:
+                cache.put(ISBN, None)
+
+    return results
@@ -0,0 +1,212 @@
+import os
+import threading
+import time
+from collections import deque
+
+import cv2
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from decoding import FrameDecoder, calibrate, set_backend, to_grayscale
+from metrics import METRICS
+from scan_events import ScanEventFilter
+
+
+def parse_source(text):
+    # A camera source as given on the command line: a device index, a video
+    # file or a stream URL.
+    text = str(text).strip()
+    return int(text) if text.isdigit() else text
+
+
+class FrameQueue:
+    # Bounded queue between the capture and decode threads. When it is full
+    # the oldest frame is dropped, so the decoder always works on recent frames
+    # instead of falling further and further behind the camera.
+    def __init__(self, maxsize=2):
+        self.frames = deque(maxlen=maxsize)
+        self.condition = threading.Condition()
+        self.dropped = 0
+        self.closed = False
+
+    def put(self, frame):
+        with self.condition:
+            if len(self.frames) == self.frames.maxlen:
+                self.dropped += 1
+                METRICS.inc('frames_dropped_total')
+            self.frames.append(frame)
+            self.condition.notify()
+
+    def get(self, timeout=None):
+        with self.condition:
+            if not self.frames and not self.closed:
+                self.condition.wait(timeout)
+            if self.frames:
+                return self.frames.popleft()
+            return None
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.frames.clear()
+            self.condition.notify_all()
+
+    def __len__(self):
+        with self.condition:
+            return len(self.frames)
+
+
+class CaptureThread(QThread):
+    # Reads frames as fast as the camera delivers them, feeds the decode queue
+    # and keeps the newest frame for the preview, which polls it at its own
+    # rate through latest_frame(). A video file stands in for a live camera:
+    # it is played at its own frame rate and loops at the end.
+    camera_error = pyqtSignal(str)
+
+    def __init__(self, frame_queue, source=0, parent=None):
+        super().__init__(parent)
+        self.frame_queue = frame_queue
+        self.source = source
+        self.frame_lock = threading.Lock()
+        self.latest = None
+        self.frame_index = 0
+        self.running = True
+
+    def run(self):
+        cap = cv2.VideoCapture(self.source)
+        if not cap.isOpened():
+            METRICS.inc('errors_total', stage='camera')
+            self.camera_error.emit(f"Could not open camera {self.source}")
+            return
+
+        is_file = isinstance(self.source, str) and os.path.isfile(self.source)
+        frame_interval = 1.0 / (cap.get(cv2.CAP_PROP_FPS) or 30.0) if is_file else 0.0
+        next_frame = time.perf_counter()
+        try:
+            while self.running:
+                if frame_interval:
+                    next_frame += frame_interval
+                    delay = next_frame - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    else:
+                        next_frame = time.perf_counter()
+
+                started = time.perf_counter()
+                ret, frame = cap.read()
+                if not ret:
+                    if is_file:
+                        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                        continue
+                    METRICS.inc('errors_total', stage='capture')
+                    self.msleep(10)
+                    continue
+                METRICS.observe('capture_seconds', time.perf_counter() - started)
+                METRICS.inc('frames_captured_total')
+                self.frame_queue.put(frame)
+                with self.frame_lock:
+                    self.latest = frame
+                    self.frame_index += 1
+        finally:
+            cap.release()
+
+    def latest_frame(self):
+        with self.frame_lock:
+            return self.frame_index, self.latest
+
+    def stop(self):
+        self.running = False
+        self.wait()
+
+
+class DecodeWorker(QThread):
+    # barcodes_decoded(barcodes, fresh): `fresh` is False when the frame was
+    # unchanged and the previous results were repeated rather than decoded.
+    barcodes_decoded = pyqtSignal(object, bool)
+
+    def __init__(self, frame_queue, decoder=None, parent=None):
+        super().__init__(parent)
+        self.frame_queue = frame_queue
+        self.decoder = decoder or FrameDecoder()
+        # A sample of recent frames, used to calibrate decoder backends; read
+        # from the GUI thread through sample_frames().
+        self.recent_frames = deque(maxlen=30)
+        self.frames_lock = threading.Lock()
+        self.frame_count = 0
+        self.running = True
+
+    def run(self):
+        had_barcodes = False
+        while self.running:
+            frame = self.frame_queue.get(timeout=0.1)
+            if frame is None:
+                continue
+
+            self.frame_count += 1
+            if self.frame_count % 5 == 0:
+                with self.frames_lock:
+                    self.recent_frames.append(frame)
+
+            started = time.perf_counter()
+            barcodes = self.decoder.decode(frame)
+            METRICS.observe('decode_seconds', time.perf_counter() - started)
+            # Empty results are only forwarded once, to clear the overlay.
+            if barcodes or had_barcodes:
+                self.barcodes_decoded.emit(barcodes, not self.decoder.cached)
+            had_barcodes = bool(barcodes)
+
+    def sample_frames(self):
+        with self.frames_lock:
+            return list(self.recent_frames)
+
+    def stop(self):
+        self.running = False
+        self.frame_queue.close()
+        self.wait()
+
+
+class CameraStation:
+    # One scanning station: a camera source with its own frame queue,
+    # capture and decode threads, and scan filter, so reads from different
+    # cameras are never combined into one scan. Stations share the window's
+    # collection (through `is_known`) and lookups.
+    def __init__(self, source, name=None, is_known=None):
+        self.source = source
+        self.name = name or str(source)
+        self.frame_queue = FrameQueue(maxsize=2)
+        self.capture_thread = CaptureThread(self.frame_queue, source)
+        self.decode_worker = DecodeWorker(self.frame_queue)
+        self.scan_filter = ScanEventFilter(is_known=is_known)
+        self.renderer = None
+        self.last_barcodes = []
+        self.rendered_index = None
+        self.overlay_changed = False
+
+    @property
+    def decoder(self):
+        return self.decode_worker.decoder
+
+    def start(self):
+        self.capture_thread.start()
+        self.decode_worker.start()
+
+    def stop(self):
+        self.capture_thread.stop()
+        self.decode_worker.stop()
+        self.scan_filter.reset()
+        self.last_barcodes = []
+
+
+class CalibrationThread(QThread):
+    # Benchmarks every decoder backend on a set of frames and switches to the
+    # one with the most successful reads per second.
+    calibrated = pyqtSignal(object)
+
+    def __init__(self, frames, parent=None):
+        super().__init__(parent)
+        self.frames = [to_grayscale(frame) for frame in frames]
+
+    def run(self):
+        results = calibrate(self.frames)
+        if results:
+            set_backend(results[0]['backend'])
+        self.calibrated.emit(results)
@@ -0,0 +1,226 @@
+import csv
+import sys
+from collections.abc import Mapping
+from datetime import datetime
+
+from search_index import SearchIndex
+
+
+CSV_FIELDNAMES = ['isbn', 'title', 'author', 'publisher', 'publish_date', 'description', 'pages', 'genre', 'language', 'timestamp']
+
+DETAIL_FIELDS = ('Title', 'Author', 'Publisher', 'Edition', 'Description', 'Pages', 'Genre', 'Language')
+
+# Values of these fields repeat across many books, so each distinct value is
+# stored once.
+INTERNED_FIELDS = ('Author', 'Publisher', 'Edition', 'Pages', 'Genre', 'Language')
+
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+class Book:
+    # One scanned book. Fields are slots rather than nested dicts, and the
+    # description can be left in storage and fetched by `loader(isbn)` when
+    # asked for. book['isbn'], book['details'][field] and book['timestamp']
+    # read like the dict entries this replaces.
+    __slots__ = ('isbn', 'title', 'author', 'publisher', 'edition', 'pages', 'genre', 'language', 'timestamp',
+                 '_description', '_loader')
+
+    def __init__(self, isbn, details, timestamp, loader=None):
+        self.isbn = isbn
+        self.timestamp = timestamp
+        self.set_details(details, loader)
+
+    def set_details(self, details, loader=None):
+        self.title = details.get('Title', 'N/A')
+        self.author = _intern(details.get('Author', 'N/A'))
+        self.publisher = _intern(details.get('Publisher', 'N/A'))
+        self.edition = _intern(details.get('Edition', 'N/A'))
+        self.pages = _intern(details.get('Pages', 'N/A'))
+        self.genre = _intern(details.get('Genre', 'N/A'))
+        self.language = _intern(details.get('Language', 'N/A'))
+
+        # Details without a description come from a store that can load it.
+        description = details.get('Description')
+        self._loader = loader if description is None else None
+        self._description = description if description is not None or loader else 'N/A'
+
+    def description(self):
+        if self._description is None:
+            return self._loader(self.isbn)
+        return self._description
+
+    def has_description(self):
+        # False while the description is only in storage.
+        return self._description is not None
+
+    def __getitem__(self, key):
+        if key == 'isbn':
+            return self.isbn
+        if key == 'details':
+            return BookDetails(self)
+        if key == 'timestamp':
+            return self.timestamp
+        raise KeyError(key)
+
+    def to_dict(self):
+        return {'isbn': self.isbn, 'details': dict(BookDetails(self)), 'timestamp': self.timestamp}
+
+
+class BookDetails(Mapping):
+    # Read-only view of a Book's details under the field names used by
+    # book_api ('Title', 'Author', ...).
+    __slots__ = ('book',)
+
+    ATTRIBUTES = {
+        'Title': 'title',
+        'Author': 'author',
+        'Publisher': 'publisher',
+        'Edition': 'edition',
+        'Pages': 'pages',
+        'Genre': 'genre',
+        'Language': 'language'
+    }
+
+    def __init__(self, book):
+        self.book = book
+
+    def __getitem__(self, field):
+        if field == 'Description':
+            return self.book.description()
+        return getattr(self.book, self.ATTRIBUTES[field])
+
+    def __iter__(self):
+        return iter(DETAIL_FIELDS)
+
+    def __len__(self):
+        return len(DETAIL_FIELDS)
+
+
+class BookCollection:
+    # Scanned books keyed by ISBN-13, in insertion order. Membership, lookup
+    # and delete are dict operations. With `search_fields`, a SearchIndex over
+    # those fields is kept as well, with facet counts and filters on
+    # `facet_fields` (e.g. 'Author'). Details added without a 'Description'
+    # get theirs from `description_loader(isbn)` when it is read. While a
+    # store is still paging books in, `unloaded(isbn)` tells whether a book
+    # is stored but not loaded yet, and membership counts those too.
+    def __init__(self, search_fields=(), facet_fields=(), description_loader=None):
+        self.description_loader = description_loader
+        self.unloaded = None
+        self.books = {}
+        self.search_index = SearchIndex(search_fields, facet_fields) if search_fields else None
+
+    def __contains__(self, isbn):
+        if isbn in self.books:
+            return True
+        return self.unloaded is not None and self.unloaded(isbn)
+
+    def __len__(self):
+        return len(self.books)
+
+    def __iter__(self):
+        return iter(self.books.values())
+
+    def get(self, isbn):
+        return self.books.get(isbn)
+
+    def isbns(self):
+        return list(self.books)
+
+    def add(self, isbn, details, timestamp=None):
+        # Returns the new entry, or None if the ISBN is already present.
+        if isbn in self.books:
+            return None
+
+        book = Book(isbn, details, timestamp or datetime.now().strftime('%Y-%m-%d %H:%M:%S'), self.description_loader)
+        self.books[isbn] = book
+        self._index(book)
+        return book
+
+    def update(self, isbn, details):
+        book = self.books.get(isbn)
+        if book is None:
+            return None
+        self._unindex(book, keep_position=True)
+        book.set_details(details, self.description_loader)
+        self._index(book)
+        return book
+
+    def remove(self, isbn):
+        book = self.books.pop(isbn, None)
+        if book is not None:
+            self._unindex(book)
+        return book
+
+    def clear(self):
+        self.books.clear()
+        if self.search_index:
+            self.search_index.clear()
+
+    def search(self, text, filters=None):
+        # Matching ISBNs (a SearchResults sequence, in collection order) for a
+        # search box query and exact {field: value} filters on facet fields;
+        # None when there is neither.
+        return self.search_index.search(text, filters)
+
+    def facets(self, results=None, top=10):
+        # Most common values of each facet field among `results`, or among
+        # every book.
+        return self.search_index.facet_counts(None if results is None else results.ids, top)
+
+    def _index(self, book):
+        if self.search_index:
+            self.search_index.add(book)
+
+    def _unindex(self, book, keep_position=False):
+        if self.search_index:
+            self.search_index.remove(book, keep_position)
+
+
+def book_from_row(row):
+    return {
+        'isbn': row['isbn'],
+        'details': {
+            'Title': row['title'],
+            'Author': row['author'],
+            'Publisher': row['publisher'],
+            'Edition': row['publish_date'],
+            'Description': row['description'],
+            'Pages': row['pages'],
+            'Genre': row['genre'],
+            'Language': row['language']
+        },
+        'timestamp': row['timestamp']
+    }
+
+
+def row_from_book(book, with_description=True):
+    return {
+        'isbn': book['isbn'],
+        'title': book['details']['Title'],
+        'author': book['details']['Author'],
+        'publisher': book['details']['Publisher'],
+        'publish_date': book['details']['Edition'],
+        'description': book['details']['Description'] if with_description else None,
+        'pages': book['details']['Pages'],
+        'genre': book['details']['Genre'],
+        'language': book['details']['Language'],
+        'timestamp': book['timestamp']
+    }
+
+
+def read_books_csv(file_name):
+    with open(file_name, 'r', newline='', encoding='utf-8') as csvfile:
+        reader = csv.DictReader(csvfile)
+        for row in reader:
+            yield book_from_row(row)
+
+
+def write_books_csv(file_name, books):
+    with open(file_name, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=CSV_FIELDNAMES)
+        writer.writeheader()
+        for book in books:
+            writer.writerow(row_from_book(book))
@@ -0,0 +1,485 @@
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError
+
+import cv2
+
+from isbn import is_valid_ean13
+from metrics import METRICS
+
+try:
+    from pyzbar.pyzbar import decode as zbar_decode, ZBarSymbol
+except ImportError:
+    zbar_decode = None
+
+try:
+    import zxingcpp
+except ImportError:
+    zxingcpp = None
+
+
+Point = namedtuple('Point', ['x', 'y'])
+Rect = namedtuple('Rect', ['left', 'top', 'width', 'height'])
+Barcode = namedtuple('Barcode', ['data', 'type', 'rect', 'polygon'])
+
+
+def bounding_rect(points):
+    xs = [point.x for point in points]
+    ys = [point.y for point in points]
+    return Rect(min(xs), min(ys), max(xs) - min(xs), max(ys) - min(ys))
+
+
+class PyzbarBackend:
+    name = "pyzbar"
+
+    def decode(self, frame):
+        return [
+            Barcode(barcode.data, barcode.type, Rect(*barcode.rect), [Point(*point) for point in barcode.polygon])
+            for barcode in zbar_decode(frame, symbols=[ZBarSymbol.EAN13])
+        ]
+
+
+class OpenCVBackend:
+    name = "opencv"
+
+    def __init__(self):
+        # Detectors are not safe to share between threads, and each camera
+        # (and each enhancement variant) decodes on its own; one per thread.
+        self.local = threading.local()
+        self.local.detector = self._create_detector()
+
+    def _create_detector(self):
+        if hasattr(cv2, 'barcode') and hasattr(cv2.barcode, 'BarcodeDetector'):
+            return cv2.barcode.BarcodeDetector()
+        return cv2.barcode_BarcodeDetector()
+
+    @property
+    def detector(self):
+        detector = getattr(self.local, 'detector', None)
+        if detector is None:
+            detector = self.local.detector = self._create_detector()
+        return detector
+
+    def decode(self, frame):
+        # OpenCV >= 4.8 reports types through detectAndDecodeWithType; the
+        # older contrib detector returns them from detectAndDecode.
+        detector = self.detector
+        if hasattr(detector, 'detectAndDecodeWithType'):
+            ok, infos, types, corners = detector.detectAndDecodeWithType(frame)
+        else:
+            ok, infos, types, corners = detector.detectAndDecode(frame)
+        if not ok or corners is None:
+            return []
+
+        results = []
+        for info, points in zip(infos, corners):
+            # EAN-13 is the only 13 digit symbology the detector reads.
+            if len(info) != 13 or not info.isdigit():
+                continue
+            polygon = [Point(int(x), int(y)) for x, y in points]
+            results.append(Barcode(info.encode('utf-8'), "EAN13", bounding_rect(polygon), polygon))
+        return results
+
+
+class ZXingBackend:
+    name = "zxing-cpp"
+
+    def decode(self, frame):
+        results = []
+        for result in zxingcpp.read_barcodes(frame, formats=zxingcpp.BarcodeFormat.EAN13):
+            position = result.position
+            polygon = [
+                Point(point.x, point.y)
+                for point in (position.top_left, position.top_right, position.bottom_right, position.bottom_left)
+            ]
+            results.append(Barcode(result.text.encode('utf-8'), "EAN13", bounding_rect(polygon), polygon))
+        return results
+
+
+def available_backends():
+    backends = {}
+    for backend_class, available in (
+        (PyzbarBackend, zbar_decode is not None),
+        (OpenCVBackend, hasattr(cv2, 'barcode') or hasattr(cv2, 'barcode_BarcodeDetector')),
+        (ZXingBackend, zxingcpp is not None)
+    ):
+        if not available:
+            continue
+        try:
+            backend = backend_class()
+        except Exception as e:
+            print(f"Error initialising {backend_class.name} decoder: {e}")
+            continue
+        backends[backend.name] = backend
+    return backends
+
+
+BACKENDS = available_backends()
+_backend = next(iter(BACKENDS.values()), None)
+
+
+def get_backend():
+    return _backend
+
+
+def set_backend(name):
+    global _backend
+    _backend = BACKENDS[name]
+
+
+def decode_barcodes(frame, backend=None):
+    backend = backend or _backend
+    try:
+        return backend.decode(frame)
+    except Exception as e:
+        print(f"Error decoding barcodes: {e}")
+        return []
+
+
+def calibrate(frames, backends=None):
+    # Runs every backend over the same frames and ranks them by successful
+    # reads per second. Returns a list of result dicts, best first.
+    backends = backends or BACKENDS
+    results = []
+    for name, backend in backends.items():
+        reads = 0
+        started = time.perf_counter()
+        for frame in frames:
+            reads += len(decode_barcodes(frame, backend))
+        elapsed = time.perf_counter() - started
+        results.append({
+            'backend': name,
+            'frames': len(frames),
+            'reads': reads,
+            'seconds': elapsed,
+            'reads_per_second': reads / elapsed if elapsed else 0.0,
+            'frames_per_second': len(frames) / elapsed if elapsed else 0.0
+        })
+    results.sort(key=lambda result: (result['reads_per_second'], result['frames_per_second']), reverse=True)
+    return results
+
+
+def to_grayscale(frame):
+    if frame.ndim == 3:
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return frame
+
+
+def transform_barcode(barcode, scale=1.0, offset_x=0, offset_y=0):
+    # Maps a result decoded on a scaled and/or cropped image back to the
+    # coordinates of the full frame.
+    def x(value):
+        return int(round(value / scale)) + offset_x
+
+    def y(value):
+        return int(round(value / scale)) + offset_y
+
+    left, top, width, height = barcode.rect
+    rect = Rect(x(left), y(top), int(round(width / scale)), int(round(height / scale)))
+    polygon = [Point(x(point.x), y(point.y)) for point in barcode.polygon]
+    return barcode._replace(rect=rect, polygon=polygon)
+
+
+class Variant:
+    # A preprocessed version of a grayscale frame. `scale` and `rotated`
+    # describe how the variant's coordinates relate to the original frame.
+    def __init__(self, name, transform, scale=1.0, rotated=False):
+        self.name = name
+        self.transform = transform
+        self.scale = scale
+        self.rotated = rotated
+
+    def map_barcode(self, barcode, frame_height):
+        def point(p):
+            x, y = p.x / self.scale, p.y / self.scale
+            if self.rotated:
+                # Undo cv2.ROTATE_90_CLOCKWISE.
+                x, y = y, frame_height - 1 - x
+            return Point(int(round(x)), int(round(y)))
+
+        polygon = [point(p) for p in barcode.polygon]
+        return barcode._replace(rect=bounding_rect(polygon), polygon=polygon)
+
+
+def _clahe(gray):
+    return cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8)).apply(gray)
+
+
+def _adaptive_threshold(gray):
+    return cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 10)
+
+
+def _sharpen(gray):
+    blurred = cv2.GaussianBlur(gray, (0, 0), 3)
+    return cv2.addWeighted(gray, 1.5, blurred, -0.5, 0)
+
+
+def _rotate(gray):
+    return cv2.rotate(gray, cv2.ROTATE_90_CLOCKWISE)
+
+
+def _resize(scale):
+    interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_CUBIC
+    return lambda gray: cv2.resize(gray, None, fx=scale, fy=scale, interpolation=interpolation)
+
+
+DEFAULT_VARIANTS = [
+    Variant('clahe', _clahe),
+    Variant('sharpen', _sharpen),
+    Variant('adaptive_threshold', _adaptive_threshold),
+    Variant('rotate_90', _rotate, rotated=True),
+    Variant('scale_0.75', _resize(0.75), scale=0.75),
+    Variant('scale_1.5', _resize(1.5), scale=1.5)
+]
+
+
+class VariantDecoder:
+    # Decodes several preprocessed variants of a frame concurrently and returns
+    # the first result with a valid EAN-13 check digit. The variants tried are
+    # chosen by past win rate and measured cost so that their summed CPU time
+    # fits `budget_ms` per worker, and the wait is capped at `budget_ms`.
+    def __init__(self, variants=None, budget_ms=40.0, max_workers=None):
+        self.variants = variants or DEFAULT_VARIANTS
+        self.budget_ms = budget_ms
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="variant")
+        self.lock = threading.Lock()
+        self.costs = {variant.name: 0.0 for variant in self.variants}
+        self.attempts = {variant.name: 0 for variant in self.variants}
+        self.wins = {variant.name: 0 for variant in self.variants}
+        self.frames = 0
+        self.hits = 0
+
+    def select(self):
+        def score(variant):
+            # Laplace-smoothed win rate, so untried variants still get a turn.
+            rate = (self.wins[variant.name] + 1) / (self.attempts[variant.name] + 2)
+            return rate / (self.costs[variant.name] + 1.0)
+
+        capacity = self.budget_ms * self.max_workers
+        chosen = []
+        spent = 0.0
+        with self.lock:
+            for variant in sorted(self.variants, key=score, reverse=True):
+                cost = self.costs[variant.name]
+                if chosen and spent + cost > capacity:
+                    continue
+                chosen.append(variant)
+                spent += cost
+        return chosen
+
+    def decode(self, gray):
+        # One instance serves the decode threads of every camera, so the
+        # counters are only changed under the lock.
+        with self.lock:
+            self.frames += 1
+        futures = {self.executor.submit(self._run, variant, gray): variant for variant in self.select()}
+        results = []
+        try:
+            for future in as_completed(futures, timeout=self.budget_ms / 1000):
+                try:
+                    results = future.result()
+                except Exception as e:
+                    print(f"Error decoding {futures[future].name} variant: {e}")
+                    continue
+                if results:
+                    with self.lock:
+                        self.wins[futures[future].name] += 1
+                        self.hits += 1
+                    break
+        except TimeoutError:
+            pass
+        for future in futures:
+            future.cancel()
+        return results
+
+    def _run(self, variant, gray):
+        started = time.perf_counter()
+        image = variant.transform(gray)
+        results = [
+            variant.map_barcode(barcode, gray.shape[0])
+            for barcode in decode_barcodes(image)
+            if is_valid_ean13(barcode.data.decode('utf-8'))
+        ]
+        elapsed = 1000 * (time.perf_counter() - started)
+        with self.lock:
+            self.attempts[variant.name] += 1
+            previous = self.costs[variant.name]
+            self.costs[variant.name] = elapsed if not previous else 0.8 * previous + 0.2 * elapsed
+        return results
+
+    def stats(self):
+        with self.lock:
+            return {
+                'frames': self.frames,
+                'hits': self.hits,
+                'variants': {
+                    name: {'attempts': self.attempts[name], 'wins': self.wins[name], 'ms': self.costs[name]}
+                    for name in self.costs
+                }
+            }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class FrameDecoder:
+    # Stateful decoder for a live camera stream. It decodes a single-channel
+    # image, skips frames that barely differ from the last decoded one, and
+    # after a hit only searches a padded region around the previous barcode.
+    # Every `full_sweep_interval` frames (or when the region loses the code)
+    # it sweeps the whole frame, smallest pyramid level first, and then hands
+    # the frame to the optional `preprocessor` (a VariantDecoder).
+    def __init__(self, roi_padding=0.5, full_sweep_interval=15, diff_threshold=2.0, max_skipped=10, pyramid_scales=(0.5, 1.0), preprocessor=None):
+        self.preprocessor = preprocessor
+        self.roi_padding = roi_padding
+        self.full_sweep_interval = full_sweep_interval
+        self.diff_threshold = diff_threshold
+        self.max_skipped = max_skipped
+        self.pyramid_scales = pyramid_scales
+        self.reset()
+
+    def reset(self):
+        self.last_rect = None
+        self.last_results = []
+        # Whether the last decode() returned last_results for an unchanged
+        # frame instead of decoding it.
+        self.cached = False
+        self.last_thumbnail = None
+        self.skipped_in_row = 0
+        self.since_full_sweep = 0
+        self.counters = {
+            'frames': 0,
+            'skipped': 0,
+            'roi_attempts': 0,
+            'roi_hits': 0,
+            'sweep_attempts': 0,
+            'sweep_hits': 0,
+            'variant_attempts': 0,
+            'variant_hits': 0
+        }
+        self.timings = {'grayscale': 0.0, 'diff': 0.0, 'roi': 0.0, 'sweep': 0.0, 'variants': 0.0}
+
+    def decode(self, frame):
+        self.counters['frames'] += 1
+
+        started = time.perf_counter()
+        gray = to_grayscale(frame)
+        elapsed = time.perf_counter() - started
+        self.timings['grayscale'] += elapsed
+        METRICS.observe('color_conversion_seconds', elapsed)
+
+        if self._unchanged(gray):
+            self.counters['skipped'] += 1
+            self.cached = True
+            METRICS.inc('frames_decoded_total', result='skipped')
+            return self.last_results
+
+        self.cached = False
+        results = []
+        if self.last_rect is not None and self.since_full_sweep < self.full_sweep_interval:
+            results = self._decode_roi(gray)
+
+        if not results:
+            results = self._sweep(gray)
+
+        self.last_results = results
+        self.last_rect = self._union_rect(results) if results else None
+        METRICS.inc('frames_decoded_total', result='hit' if results else 'miss')
+        return results
+
+    def _unchanged(self, gray):
+        # Mean absolute difference of small thumbnails; cheap compared to a
+        # zbar pass over the frame.
+        started = time.perf_counter()
+        thumbnail = cv2.resize(gray, (80, 60), interpolation=cv2.INTER_AREA)
+        previous = self.last_thumbnail
+        unchanged = (
+            previous is not None
+            and self.skipped_in_row < self.max_skipped
+            and cv2.absdiff(thumbnail, previous).mean() < self.diff_threshold
+        )
+        if unchanged:
+            self.skipped_in_row += 1
+        else:
+            self.skipped_in_row = 0
+            self.last_thumbnail = thumbnail
+        self.timings['diff'] += time.perf_counter() - started
+        return unchanged
+
+    def _decode_roi(self, gray):
+        started = time.perf_counter()
+        self.counters['roi_attempts'] += 1
+        self.since_full_sweep += 1
+
+        frame_height, frame_width = gray.shape[:2]
+        left, top, width, height = self.last_rect
+        pad_x = int(width * self.roi_padding)
+        pad_y = int(height * self.roi_padding)
+        x0, y0 = max(0, left - pad_x), max(0, top - pad_y)
+        x1, y1 = min(frame_width, left + width + pad_x), min(frame_height, top + height + pad_y)
+
+        results = [transform_barcode(barcode, 1.0, x0, y0) for barcode in decode_barcodes(gray[y0:y1, x0:x1])]
+        if results:
+            self.counters['roi_hits'] += 1
+        elapsed = time.perf_counter() - started
+        self.timings['roi'] += elapsed
+        METRICS.observe('decode_stage_seconds', elapsed, stage='roi')
+        return results
+
+    def _sweep(self, gray):
+        started = time.perf_counter()
+        self.counters['sweep_attempts'] += 1
+        self.since_full_sweep = 0
+
+        results = []
+        for scale in self.pyramid_scales:
+            if scale == 1.0:
+                image = gray
+            else:
+                image = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            results = [transform_barcode(barcode, scale) for barcode in decode_barcodes(image)]
+            if results:
+                self.counters['sweep_hits'] += 1
+                break
+        elapsed = time.perf_counter() - started
+        self.timings['sweep'] += elapsed
+        METRICS.observe('decode_stage_seconds', elapsed, stage='sweep')
+
+        preprocessor = self.preprocessor
+        if not results and preprocessor is not None:
+            started = time.perf_counter()
+            self.counters['variant_attempts'] += 1
+            results = preprocessor.decode(gray)
+            if results:
+                self.counters['variant_hits'] += 1
+            elapsed = time.perf_counter() - started
+            self.timings['variants'] += elapsed
+            METRICS.observe('decode_stage_seconds', elapsed, stage='variants')
+        return results
+
+    def _union_rect(self, results):
+        left = min(barcode.rect.left for barcode in results)
+        top = min(barcode.rect.top for barcode in results)
+        right = max(barcode.rect.left + barcode.rect.width for barcode in results)
+        bottom = max(barcode.rect.top + barcode.rect.height for barcode in results)
+        return Rect(left, top, right - left, bottom - top)
+
+    def stats(self):
+        counters = dict(self.counters)
+        decoded = counters['frames'] - counters['skipped']
+        attempts = counters['roi_attempts'] + counters['sweep_attempts']
+        hits = counters['roi_hits'] + counters['sweep_hits'] + counters['variant_hits']
+        counters['decoded_frames'] = decoded
+        counters['hit_rate'] = hits / decoded if decoded else 0.0
+        counters['roi_hit_rate'] = counters['roi_hits'] / counters['roi_attempts'] if counters['roi_attempts'] else 0.0
+        counters['attempts'] = attempts
+        counters['ms_per_frame'] = {
+            stage: 1000 * total / counters['frames'] if counters['frames'] else 0.0
+            for stage, total in self.timings.items()
+        }
+        if self.preprocessor is not None:
+            counters['preprocessing'] = self.preprocessor.stats()
+        return counters
@@ -0,0 +1,242 @@
+import argparse
+import sys
+
+# numpy is only needed by the array functions, which import it on first use
+# so that importing this module stays cheap.
+np = None
+
+
+def clean(isbn):
+    return isbn.replace("-", "").replace(" ", "").strip().upper()
+
+
+def isbn10_check_digit(first9):
+    total = sum(int(char) * (10 - i) for i, char in enumerate(first9))
+    check_digit = (11 - (total % 11)) % 11
+    return 'X' if check_digit == 10 else str(check_digit)
+
+
+def isbn13_check_digit(first12):
+    total = sum(int(char) * (1 if i % 2 == 0 else 3) for i, char in enumerate(first12))
+    return str((10 - (total % 10)) % 10)
+
+
+def is_valid_ean13(code):
+    return len(code) == 13 and code.isdigit() and isbn13_check_digit(code[:12]) == code[12]
+
+
+def is_valid_isbn13(isbn):
+    return isbn.startswith(('978', '979')) and is_valid_ean13(isbn)
+
+
+def is_valid_isbn10(isbn):
+    if len(isbn) != 10 or not isbn[:9].isdigit() or not (isbn[9].isdigit() or isbn[9] == 'X'):
+        return False
+    return isbn10_check_digit(isbn[:9]) == isbn[9]
+
+
+def isbn10_to_isbn13(isbn10):
+    isbn10 = clean(isbn10)
+    if not is_valid_isbn10(isbn10):
+        return None
+    isbn13 = '978' + isbn10[:9]
+    return isbn13 + isbn13_check_digit(isbn13)
+
+
+def isbn13_to_isbn10(isbn13):
+    # Only 978-prefixed ISBN-13s have an ISBN-10 equivalent.
+    isbn13 = clean(isbn13)
+    if not is_valid_isbn13(isbn13) or not isbn13.startswith('978'):
+        return None
+    isbn10 = isbn13[3:12]
+    return isbn10 + isbn10_check_digit(isbn10)
+
+
+def to_isbn13(isbn):
+    # Normalizes an ISBN-10 or ISBN-13 (hyphens allowed) to a validated
+    # ISBN-13, or returns None.
+    isbn = clean(isbn)
+    if len(isbn) == 10:
+        return isbn10_to_isbn13(isbn)
+    if len(isbn) == 13 and is_valid_isbn13(isbn):
+        return isbn
+    return None
+
+
+def swap_format(isbn):
+    # ISBN-10 -> ISBN-13 and ISBN-13 -> ISBN-10, as in the converter window.
+    isbn = clean(isbn)
+    if len(isbn) == 10:
+        return isbn10_to_isbn13(isbn)
+    return isbn13_to_isbn10(isbn)
+
+
+# Vectorized versions for large batches. Each ISBN becomes a row of 13 code
+# points, so validation and conversion are a handful of whole-array numpy
+# operations instead of a Python loop per character.
+
+
+def _require_numpy():
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError("numpy is required for the vectorized ISBN functions")
+        np = numpy
+
+
+def has_numpy():
+    # Whether the array functions can be used.
+    try:
+        _require_numpy()
+    except ImportError:
+        return False
+    return True
+
+
+def _code_points(isbns):
+    # Separators and whitespace are squeezed out on the code point matrix
+    # itself; np.char string operations would be several times slower.
+    isbns = np.asarray(isbns, dtype=str).reshape(-1)
+    width = max(isbns.dtype.itemsize // 4, 13)
+    codes = np.frombuffer(isbns.astype(f'<U{width}').tobytes(), dtype=np.uint32).reshape(-1, width)
+    codes = np.where(codes == ord('x'), ord('X'), codes)
+
+    keep = (codes != 0) & (codes != ord('-')) & (codes != ord(' ')) & (codes != ord('\t')) & (codes != ord('\r')) & (codes != ord('\n'))
+    lengths = keep.sum(axis=1)
+    if not keep.all():
+        order = np.argsort(~keep, axis=1, kind='stable')
+        codes = np.take_along_axis(np.where(keep, codes, 0), order, axis=1)
+    return codes[:, :13].astype(np.int32), lengths
+
+
+def _digits(codes):
+    digits = codes - ord('0')
+    return digits, (digits >= 0) & (digits <= 9)
+
+
+def _from_digits(digits, width):
+    codes = (digits + ord('0')).astype(np.uint32)
+    return np.ascontiguousarray(codes).view(f'<U{width}').reshape(-1)
+
+
+def _isbn13_check_digits(first12):
+    weights = np.tile(np.array([1, 3], dtype=np.int32), 6)
+    return (10 - first12.dot(weights) % 10) % 10
+
+
+def _isbn10_check_values(first9):
+    weights = np.arange(10, 1, -1, dtype=np.int32)
+    return (11 - first9.dot(weights) % 11) % 11
+
+
+def _isbn10_rows(codes, lengths):
+    digits, is_digit = _digits(codes[:, :10])
+    last = np.where(codes[:, 9] == ord('X'), 10, digits[:, 9])
+    last_ok = is_digit[:, 9] | (codes[:, 9] == ord('X'))
+    valid = (lengths == 10) & is_digit[:, :9].all(axis=1) & last_ok
+    valid &= _isbn10_check_values(np.where(is_digit[:, :9], digits[:, :9], 0)) == last
+    return digits, valid
+
+
+def _isbn13_rows(codes, lengths):
+    digits, is_digit = _digits(codes)
+    digits = np.where(is_digit, digits, 0)
+    prefix = digits[:, 0] * 100 + digits[:, 1] * 10 + digits[:, 2]
+    valid = (lengths == 13) & is_digit.all(axis=1) & ((prefix == 978) | (prefix == 979))
+    valid &= _isbn13_check_digits(digits[:, :12]) == digits[:, 12]
+    return digits, valid
+
+
+def validate_array(isbns):
+    # Boolean mask of entries that are valid ISBN-10s or ISBN-13s.
+    _require_numpy()
+    codes, lengths = _code_points(isbns)
+    _, valid10 = _isbn10_rows(codes, lengths)
+    _, valid13 = _isbn13_rows(codes, lengths)
+    return valid10 | valid13
+
+
+def to_isbn13_array(isbns):
+    # Array version of to_isbn13; invalid entries become empty strings.
+    _require_numpy()
+    codes, lengths = _code_points(isbns)
+    digits10, valid10 = _isbn10_rows(codes, lengths)
+    digits13, valid13 = _isbn13_rows(codes, lengths)
+
+    converted = np.empty((len(codes), 13), dtype=np.int32)
+    converted[:, :3] = [9, 7, 8]
+    converted[:, 3:12] = np.where(valid10[:, None], digits10[:, :9], 0)
+    converted[:, 12] = _isbn13_check_digits(converted[:, :12])
+
+    result = np.where(valid10[:, None], converted, digits13)
+    out = _from_digits(result, 13)
+    return np.where(valid10 | valid13, out, '')
+
+
+def to_isbn10_array(isbns):
+    # Array version of isbn13_to_isbn10 (ISBN-10 input is validated and passed
+    # through); invalid entries and 979-prefixed ISBNs become empty strings.
+    _require_numpy()
+    codes, lengths = _code_points(isbns)
+    digits10, valid10 = _isbn10_rows(codes, lengths)
+    digits13, valid13 = _isbn13_rows(codes, lengths)
+    valid13 &= digits13[:, 2] == 8
+
+    first9 = np.where(valid13[:, None], digits13[:, 3:12], np.where(valid10[:, None], digits10[:, :9], 0))
+    check = _isbn10_check_values(first9)
+    out = np.empty((len(codes), 10), dtype=np.int32)
+    out[:, :9] = first9 + ord('0')
+    out[:, 9] = np.where(check == 10, ord('X'), check + ord('0'))
+    strings = np.ascontiguousarray(out.astype(np.uint32)).view('<U10').reshape(-1)
+    return np.where(valid10 | valid13, strings, '')
+
+
+def swap_format_array(isbns):
+    # Array version of swap_format; invalid entries become empty strings.
+    _require_numpy()
+    codes, lengths = _code_points(isbns)
+    _, valid10 = _isbn10_rows(codes, lengths)
+    return np.where(valid10, to_isbn13_array(isbns), to_isbn10_array(isbns))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate and convert ISBNs, one per line.")
+    parser.add_argument('input', nargs='?', default='-', help="input file (default: stdin)")
+    parser.add_argument('-o', '--output', default='-', help="output file (default: stdout)")
+    parser.add_argument('--to', choices=['13', '10'], default='13', help="target format (default: %(default)s)")
+    parser.add_argument('--chunk-size', type=int, default=100000, help="lines converted per batch")
+    parser.add_argument('--only-valid', action='store_true', help="drop lines that are not valid ISBNs")
+    args = parser.parse_args(argv)
+
+    _require_numpy()
+    convert = to_isbn13_array if args.to == '13' else to_isbn10_array
+    source = sys.stdin if args.input == '-' else open(args.input, 'r', encoding='utf-8')
+    target = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8', newline='')
+
+    total = 0
+    invalid = 0
+    try:
+        while True:
+            lines = [line.strip() for _, line in zip(range(args.chunk_size), source)]
+            if not lines:
+                break
+            converted = convert(lines)
+            total += len(lines)
+            invalid += int((converted == '').sum())
+            for original, result in zip(lines, converted.tolist()):
+                if result or not args.only_valid:
+                    target.write(f"{original},{result}\n")
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+
+    print(f"Converted {total - invalid} of {total} ISBNs ({invalid} invalid)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
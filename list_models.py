@@ -0,0 +1,124 @@
+from collections import deque
+
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, Qt
+
+
+# Row data for the book list is looked up in the collection when a row is
+# painted, so only the rows on screen are ever formatted. Views should set
+# uniform item sizes; otherwise Qt measures every row to lay out the list.
+ISBN_ROLE = Qt.UserRole
+
+
+class BookListModel(QAbstractListModel):
+    # One row per ISBN of a BookCollection, in the order they were added, or
+    # per ISBN of a search result (any sequence of ISBNs) while filtering.
+    def __init__(self, collection, parent=None):
+        super().__init__(parent)
+        self.collection = collection
+        self.isbns = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.isbns)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.isbns):
+            return None
+        isbn = self.isbns[index.row()]
+        if role == Qt.DisplayRole:
+            book = self.collection.get(isbn)
+            title = book['details']['Title'] if book else ''
+            return f"{isbn} - {title}"
+        if role == ISBN_ROLE:
+            return isbn
+        return None
+
+    def isbn_at(self, row):
+        if 0 <= row < len(self.isbns):
+            return self.isbns[row]
+        return None
+
+    def set_collection(self, collection):
+        # Replaces every row at once; used after loading and importing.
+        self.beginResetModel()
+        self.collection = collection
+        self.isbns = collection.isbns()
+        self.endResetModel()
+
+    def set_isbns(self, isbns):
+        self.beginResetModel()
+        self.isbns = isbns
+        self.endResetModel()
+
+    def append(self, isbns):
+        isbns = list(isbns)
+        if not isbns:
+            return
+        first = len(self.isbns)
+        self.beginInsertRows(QModelIndex(), first, first + len(isbns) - 1)
+        self.isbns.extend(isbns)
+        self.endInsertRows()
+
+    def remove(self, isbns):
+        # Removes the rows of `isbns` as contiguous runs, last run first so
+        # earlier row numbers stay valid.
+        isbns = set(isbns)
+        rows = [row for row, isbn in enumerate(self.isbns) if isbn in isbns]
+        if not rows:
+            return
+
+        runs = []
+        start = end = rows[0]
+        for row in rows[1:]:
+            if row == end + 1:
+                end = row
+            else:
+                runs.append((start, end))
+                start = end = row
+        runs.append((start, end))
+
+        for start, end in reversed(runs):
+            self.beginRemoveRows(QModelIndex(), start, end)
+            del self.isbns[start:end + 1]
+            self.endRemoveRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self.isbns = []
+        self.endResetModel()
+
+    def refresh(self):
+        # Titles come from the collection, so after details change in place
+        # the visible rows only need repainting.
+        if self.isbns:
+            self.dataChanged.emit(self.index(0), self.index(len(self.isbns) - 1), [Qt.DisplayRole])
+
+
+class LogModel(QAbstractListModel):
+    # Process log that keeps the last `capacity` lines; older lines drop off
+    # the top so a long session does not grow it without limit.
+    def __init__(self, capacity=1000, parent=None):
+        super().__init__(parent)
+        self.lines = deque(maxlen=capacity)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.lines)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and index.isValid() and index.row() < len(self.lines):
+            return self.lines[index.row()]
+        return None
+
+    def append(self, line):
+        if len(self.lines) == self.lines.maxlen:
+            self.beginRemoveRows(QModelIndex(), 0, 0)
+            self.lines.popleft()
+            self.endRemoveRows()
+        row = len(self.lines)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.lines.append(line)
+        self.endInsertRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self.lines.clear()
+        self.endResetModel()
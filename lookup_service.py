@@ -0,0 +1,89 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from metrics import METRICS
+
+
+# book_api pulls in requests; it is imported on the worker threads (the
+# service's and the scan queue's) so that creating them does not slow down
+# startup.
+def get_book_details(isbn):
+    from book_api import get_book_details
+    return get_book_details(isbn)
+
+
+def lookup_book_details(isbn):
+    from book_api import lookup_book_details
+    return lookup_book_details(isbn)
+
+
+def get_books_details(isbns, refresh=False):
+    from book_api import get_books_details
+    return get_books_details(isbns, refresh=refresh)
+
+
+class LookupService(QObject):
+    # Resolves ISBNs on a background thread pool. Requests for an ISBN that is
+    # already being looked up are attached to the in-flight lookup instead of
+    # starting a new one, and every finished lookup is reported once through
+    # lookup_finished(isbn, book_details or None, sources).
+    lookup_finished = pyqtSignal(str, object, object)
+    batch_finished = pyqtSignal(object, str)
+
+    def __init__(self, max_workers=4, parent=None):
+        super().__init__(parent)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="lookup")
+        self.lock = threading.Lock()
+        self.in_flight = {}
+
+    def lookup(self, isbn, source="SCANNED"):
+        with self.lock:
+            if isbn in self.in_flight:
+                self.in_flight[isbn].append(source)
+                return False
+            self.in_flight[isbn] = [source]
+
+        future = self.executor.submit(get_book_details, isbn)
+        future.add_done_callback(lambda f: self._finish(isbn, f))
+        return True
+
+    def lookup_many(self, isbns, source="REFRESH", refresh=False):
+        # Resolves a whole list through the batch endpoints and reports the
+        # {isbn: book_details or None} mapping once via batch_finished. With
+        # refresh=True the local tiers are bypassed (see get_books_details).
+        future = self.executor.submit(get_books_details, list(isbns), refresh)
+        future.add_done_callback(lambda f: self._finish_batch(source, f))
+
+    def _finish(self, isbn, future):
+        if future.cancelled():
+            with self.lock:
+                self.in_flight.pop(isbn, None)
+            return
+
+        try:
+            book_details = future.result()
+        except Exception as e:
+            METRICS.inc('errors_total', stage='lookup')
+            print(f"Error looking up {isbn}: {e}")
+            book_details = None
+
+        with self.lock:
+            sources = self.in_flight.pop(isbn, [])
+        self.lookup_finished.emit(isbn, book_details, sources)
+
+    def _finish_batch(self, source, future):
+        if future.cancelled():
+            return
+
+        try:
+            results = future.result()
+        except Exception as e:
+            METRICS.inc('errors_total', stage='lookup')
+            print(f"Error looking up batch: {e}")
+            results = {}
+        self.batch_finished.emit(results, source)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -1,115 +1,57 @@
-from PyQt5.QtWidgets import QApplication, QWidget, QLabel, QPushButton, QTextEdit, QVBoxLayout, QHBoxLayout, QFrame, QListWidget
+import time
+STARTED = time.perf_counter()
+
+from PyQt5.QtWidgets import QApplication, QWidget, QLabel, QPushButton, QTextEdit, QVBoxLayout, QHBoxLayout, QGridLayout, QFrame, QListView
 from PyQt5.QtCore import QTimer, Qt
-from PyQt5.QtGui import QImage, QPixmap
-from datetime import datetime
+from PyQt5.QtGui import QPixmap
 from PyQt5.QtWidgets import QComboBox, QLineEdit
-from PyQt5.QtWidgets import QMenuBar, QAction, QFileDialog, QMainWindow
-import subprocess
+from PyQt5.QtWidgets import QMenuBar, QAction, QActionGroup, QFileDialog, QInputDialog, QMainWindow
+import argparse
+import importlib
+import math
 import sys
-import csv
-import cv2
-from pyzbar.pyzbar import decode, ZBarSymbol
-import requests
+import sqlite3
 import winsound
+from concurrent.futures import ThreadPoolExecutor
+from lookup_service import LookupService
+from metadata_cache import get_metadata_cache
+from collection import BookCollection, read_books_csv, write_books_csv
+from startup import StartupThread, StartupTimer
+from list_models import BookListModel, LogModel
+from search_index import FACET_FIELDS, SEARCH_FIELDS
+from metrics import METRICS, JsonDumper, MetricsServer, RateTracker, summary
+from scan_queue import QueueResolver, ScanQueue, pending_details
+from isbn import clean, to_isbn13, is_valid_isbn10, is_valid_isbn13
 
 
-def get_book_details(ISBN):
-    def fetch_from_google_books(ISBN):
-        URL = "https://www.googleapis.com/books/v1/volumes?q=isbn:" + str(ISBN)
-        try:
-            Response = requests.get(URL)
-            Response.raise_for_status()
-            BookData = Response.json()
-            if BookData["totalItems"] == 0:
-                return None
-            else:
-                volume_info = BookData["items"][0]["volumeInfo"]
-                identifiers = volume_info.get("industryIdentifiers", [])
-                isbn_13 = None
-                for identifier in identifiers:
-                    if identifier["type"] == "ISBN_13":
-                        isbn_13 = identifier["identifier"]
-                        break
-                if not isbn_13:
-                    return None  # If no ISBN-13 is found, return None
-
-                title = volume_info.get("title", "N/A")
-                authors = volume_info.get("authors", ["N/A"])
-                author = authors[0] if authors else "N/A"
-                publisher = volume_info.get("publisher", "N/A")
-                publishedDate = volume_info.get("publishedDate", "N/A")
-                description = volume_info.get("description", "N/A")
-                pageCount = volume_info.get("pageCount", "N/A")
-                categories = volume_info.get("categories", ["N/A"])
-                category = categories[0] if categories else "N/A"
-                language = volume_info.get("language", "N/A")
-
-                book_details = {
-                    "ISBN-13": isbn_13,
-                    "Title": title,
-                    "Author": author,
-                    "Publisher": publisher,
-                    "Edition": publishedDate,
-                    "Description": description,
-                    "Pages": pageCount,
-                    "Genre": category,
-                    "Language": language
-                }
-                return book_details
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching book details from Google Books: {e}")
-            return None
-
-    def fetch_from_open_library(ISBN):
-        URL = f"https://openlibrary.org/api/books?bibkeys=ISBN:{ISBN}&format=json&jscmd=data"
-        try:
-            Response = requests.get(URL)
-            Response.raise_for_status()
-            BookData = Response.json()
-            if not BookData:
-                return None
-            else:
-                book_data = BookData.get(f"ISBN:{ISBN}", {})
-                if not book_data:
-                    return None
-
-                isbn_13 = ISBN
-                title = book_data.get("title", "N/A")
-                authors = book_data.get("authors", [{"name": "N/A"}])
-                author = authors[0]["name"] if authors else "N/A"
-                publisher = book_data.get("publishers", [{"name": "N/A"}])[0]["name"]
-                publishedDate = book_data.get("publish_date", "N/A")
-                description = book_data.get("notes", "N/A")
-                pageCount = book_data.get("number_of_pages", "N/A")
-                categories = book_data.get("subjects", [{"name": "N/A"}])
-                category = categories[0]["name"] if categories else "N/A"
-                language = book_data.get("languages", [{"key": "/languages/eng"}])[0]["key"].split('/')[-1]
-
-                book_details = {
-                    "ISBN-13": isbn_13,
-                    "Title": title,
-                    "Author": author,
-                    "Publisher": publisher,
-                    "Edition": publishedDate,
-                    "Description": description,
-                    "Pages": pageCount,
-                    "Genre": category,
-                    "Language": language
-                }
-                return book_details
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching book details from Open Library: {e}")
-            return None
-
-    book_details = fetch_from_google_books(ISBN)
-    if not book_details:
-        book_details = fetch_from_open_library(ISBN)
-    
-    return book_details
+# The preview is redrawn at most this often, however fast frames are decoded.
+PREVIEW_FPS = 30
+# Size of the preview area, shared out in a grid when there are several cameras.
+PREVIEW_SIZE = (640, 480)
+
+# Lines kept in the process log.
+PROCESS_LOG_SIZE = 1000
+
+# The search box waits this long after the last keystroke before searching.
+SEARCH_DELAY_MS = 150
+# Genres offered in the search filter, most common first.
+GENRE_FACETS = 20
+
+# How often the metrics overlay and the throughput figures are refreshed.
+METRICS_OVERLAY_MS = 1000
+THROUGHPUT_COUNTERS = {
+    'captured': 'frames_captured_total',
+    'decoded': 'frames_decoded_total',
+    'scans': 'scan_events_total'
+}
+
+
+# OpenCV, pyzbar and requests are imported by the startup thread once the
+# window is visible; the methods that need them import them locally.
 
 
 class ISBNScanner(QMainWindow):
-    def __init__(self):
+    def __init__(self, startup_timing=False, camera_sources=None):
         super().__init__()
 
         self.setWindowTitle("ISBN Scanner")
@@ -149,10 +91,60 @@ class ISBNScanner(QMainWindow):
         isbn_converter_action.triggered.connect(self.open_isbn_converter)
         tools_menu.addAction(isbn_converter_action)
 
+        refresh_action = QAction('Refresh Book Details', self)
+        refresh_action.triggered.connect(self.refresh_book_details)
+        tools_menu.addAction(refresh_action)
+
+        cache_stats_action = QAction('Cache Statistics', self)
+        cache_stats_action.triggered.connect(self.show_cache_stats)
+        tools_menu.addAction(cache_stats_action)
+
+        retry_pending_action = QAction('Retry Pending Lookups', self)
+        retry_pending_action.triggered.connect(self.retry_pending_lookups)
+        tools_menu.addAction(retry_pending_action)
+
+        metrics_overlay_action = QAction('Metrics Overlay', self, checkable=True)
+        metrics_overlay_action.toggled.connect(self.toggle_metrics_overlay)
+        tools_menu.addAction(metrics_overlay_action)
+
+        camera_sources_action = QAction('Camera Sources...', self)
+        camera_sources_action.triggered.connect(self.edit_camera_sources)
+        tools_menu.addAction(camera_sources_action)
+
+        # Filled in once the decoder backends have been imported.
+        self.decoder_menu = tools_menu.addMenu('Decoder')
+        self.decoder_menu.setEnabled(False)
+        self.decoder_actions = QActionGroup(self)
+        self.decoder_actions.setExclusive(True)
+
+        decoder_stats_action = QAction('Decoder Statistics', self)
+        decoder_stats_action.triggered.connect(self.show_decoder_stats)
+        tools_menu.addAction(decoder_stats_action)
+
         # Other UI components
-        self.video_label = QLabel(self)
-        self.video_label.setFixedSize(640, 480)
-        self.video_label.setAlignment(Qt.AlignCenter)
+        # One preview label per camera, laid out in a grid by
+        # build_preview_grid(); video_label is the first one.
+        self.preview_widget = QWidget(self)
+        self.preview_widget.setFixedSize(*PREVIEW_SIZE)
+        self.preview_grid = QGridLayout(self.preview_widget)
+        self.preview_grid.setContentsMargins(0, 0, 0, 0)
+        self.preview_grid.setSpacing(0)
+        self.video_labels = []
+
+        # Combined figures for all cameras, refreshed while they run.
+        self.throughput_label = QLabel("", self)
+        self.throughput_rates = RateTracker()
+        self.throughput_timer = QTimer(self)
+        self.throughput_timer.timeout.connect(self.update_throughput)
+
+        # Drawn over the top-left corner of the preview when enabled.
+        self.metrics_overlay = QLabel(self.preview_widget)
+        self.metrics_overlay.setStyleSheet("background-color: rgba(0, 0, 0, 160); color: #00ff00; font-family: monospace; padding: 4px;")
+        self.metrics_overlay.move(8, 8)
+        self.metrics_overlay.hide()
+        self.metrics_rates = RateTracker()
+        self.metrics_timer = QTimer(self)
+        self.metrics_timer.timeout.connect(self.update_metrics_overlay)
 
         self.details_text = QTextEdit(self)
         self.details_text.setReadOnly(True)
@@ -176,6 +168,22 @@ class ISBNScanner(QMainWindow):
         self.add_button = QPushButton("Add", self)
         self.add_button.clicked.connect(self.add_isbn)
 
+        self.search_input = QLineEdit(self)
+        self.search_input.setPlaceholderText("Search title, author, publisher, genre or ISBN")
+        self.search_input.setClearButtonEnabled(True)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DELAY_MS)
+        self.search_timer.timeout.connect(self.apply_search)
+        self.search_input.textChanged.connect(self.search_timer.start)
+
+        self.genre_filter = QComboBox(self)
+        self.genre_filter.addItem("All genres", "")
+        self.genre_filter.currentIndexChanged.connect(self.apply_search)
+
+        self.search_count_label = QLabel("", self)
+        self.searching = False
+
         self.toggle_dark_theme_button = QPushButton("Toggle Dark Theme", self)
         self.toggle_dark_theme_button.clicked.connect(self.toggle_dark_theme)
 
@@ -189,11 +197,21 @@ class ISBNScanner(QMainWindow):
         self.status_label.setFrameStyle(QFrame.Panel | QFrame.Sunken)
         self.status_label.setAlignment(Qt.AlignLeft)
 
-        self.process_list = QListWidget(self)
-        self.book_list = QListWidget(self)
-        self.book_list.itemClicked.connect(self.display_selected_book_details_wrapper)
-
-        self.left_layout.addWidget(self.video_label)
+        # Model/view lists: only the rows on screen are formatted, so large
+        # collections load and scroll without one widget item per book.
+        self.process_log = LogModel(PROCESS_LOG_SIZE, self)
+        self.process_list = QListView(self)
+        self.process_list.setModel(self.process_log)
+        self.process_list.setUniformItemSizes(True)
+        self.book_model = BookListModel(BookCollection(), self)
+        self.book_list = QListView(self)
+        self.book_list.setModel(self.book_model)
+        self.book_list.setUniformItemSizes(True)
+        self.book_list.clicked.connect(self.display_selected_book_details_wrapper)
+
+        self.build_preview_grid(1)
+        self.left_layout.addWidget(self.preview_widget)
+        self.left_layout.addWidget(self.throughput_label)
         self.left_layout.addWidget(self.status_label)
 
         self.isbn_entry_layout = QHBoxLayout()
@@ -208,7 +226,13 @@ class ISBNScanner(QMainWindow):
         self.left_layout.addLayout(self.button_layout)
         self.left_layout.insertLayout(2, self.isbn_entry_layout)
 
+        self.search_layout = QHBoxLayout()
+        self.search_layout.addWidget(self.search_input)
+        self.search_layout.addWidget(self.genre_filter)
+        self.search_layout.addWidget(self.search_count_label)
+
         self.right_layout.addWidget(self.details_text)
+        self.right_layout.addLayout(self.search_layout)
         self.right_layout.addWidget(self.book_list)
         self.right_layout.addWidget(self.process_list)
 
@@ -221,132 +245,349 @@ class ISBNScanner(QMainWindow):
         self.layout.addLayout(self.right_layout)
         central_widget.setLayout(self.layout)
 
-        self.scanned_books = []
-        self.load_scanned_books()
+        self.isbn_converter = None
 
-        self.cap = cv2.VideoCapture(0)
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.update_frame)
-        self.timer.start(10)
+        # Replaced by the loaded collection when the startup thread is done;
+        # until then scans and edits are held off.
+        self.scanned_books = BookCollection(search_fields=SEARCH_FIELDS, facet_fields=FACET_FIELDS)
+        self.store = None
+        self.collection_ready = False
+        self.camera_ready = False
+        self.add_button.setEnabled(False)
+
+        # Pages in the rest of the collection after the first page, one page
+        # per turn of the event loop.
+        self.page_timer = QTimer(self)
+        self.page_timer.setInterval(0)
+        self.page_timer.timeout.connect(self.load_next_page)
 
         self.flash_timer = QTimer()
         self.flash_timer.timeout.connect(self.reset_flash)
         self.flash_timer.setSingleShot(True)
 
+        self.lookup_service = LookupService()
+        self.lookup_service.lookup_finished.connect(self.handle_lookup_finished)
+        self.lookup_service.batch_finished.connect(self.handle_batch_finished)
+
+        # Scans are stored as pending entries right away and their details
+        # filled in by the resolver, so a scan is never lost to the network.
+        self.scan_queue = None
+        self.queue_resolver = None
+
+        # winsound.Beep blocks for the length of the tone, so beeps are played
+        # one after another on their own thread.
+        self.sound_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sound")
+
+        # Each camera source is a CameraStation with its own capture and
+        # decode threads; they all feed the one collection and scan queue.
+        self.camera_sources = list(camera_sources or [0])
+        self.stations = []
+        self.calibration_thread = None
+        self.variant_decoder = None
+        self.enhancement_enabled = False
+
+        self.preview_timer = QTimer()
+        self.preview_timer.timeout.connect(self.update_frame)
+
+        self.startup_timing = startup_timing
+        self.startup_timer = StartupTimer(STARTED)
+        self.first_frame_shown = False
+        self.startup_thread = StartupThread(self.startup_timer, SEARCH_FIELDS, FACET_FIELDS)
+        self.startup_thread.progress.connect(self.update_status)
+        self.startup_thread.camera_support_ready.connect(self.handle_camera_support_ready)
+        self.startup_thread.collection_loaded.connect(self.handle_collection_loaded)
+        self.startup_thread.failed.connect(lambda message: self.update_status(f"Startup failed: {message}", "red"))
+        QTimer.singleShot(0, self.start_background_startup)
+
+    def start_background_startup(self):
+        self.startup_timer.mark("window shown")
+        self.startup_thread.start()
+
+    def handle_camera_support_ready(self):
+        from decoding import BACKENDS, get_backend
+
+        for name in BACKENDS:
+            backend_action = QAction(name, self, checkable=True)
+            backend_action.setChecked(get_backend() is BACKENDS[name])
+            backend_action.triggered.connect(lambda checked, name=name: self.select_decoder(name))
+            self.decoder_actions.addAction(backend_action)
+            self.decoder_menu.addAction(backend_action)
+        self.decoder_menu.addSeparator()
+        enhance_action = QAction('Enhance Difficult Frames', self, checkable=True)
+        enhance_action.toggled.connect(self.toggle_enhancement)
+        self.decoder_menu.addAction(enhance_action)
+        calibrate_action = QAction('Calibrate', self)
+        calibrate_action.triggered.connect(self.calibrate_decoder)
+        self.decoder_menu.addAction(calibrate_action)
+        self.decoder_menu.setEnabled(True)
+
+        self.camera_ready = True
+        if self.camera_on:
+            self.start_camera()
+
+    def handle_collection_loaded(self, store, collection):
+        self.store = store
+        self.scanned_books = collection
+        self.load_scanned_books()
+        self.collection_ready = True
+
+        self.scan_queue = ScanQueue()
+        self.queue_resolver = QueueResolver(self.scan_queue)
+        self.queue_resolver.resolved.connect(self.handle_queued_lookup)
+        self.queue_resolver.deferred.connect(self.handle_lookup_deferred)
+        self.queue_resolver.start()
+        self.add_button.setEnabled(True)
+        self.startup_timer.mark("interactive")
+        if store.loading():
+            self.update_status(f"Ready, loading books ({len(collection)} so far)...", "green")
+            self.page_timer.start()
+        else:
+            self.update_status(f"Ready ({len(collection)} books)", "green")
+        self.report_startup_timing()
+
+    def load_next_page(self):
+        isbns = self.store.load_more(self.scanned_books)
+        if not self.searching:
+            self.book_model.append(isbns)
+        if self.store.loading():
+            return
+
+        self.page_timer.stop()
+        # Search results and genre counts now cover the whole collection.
+        self.apply_search()
+        self.update_status(f"Ready ({len(self.scanned_books)} books)", "green")
+
+    def report_startup_timing(self):
+        # Printed once both the collection and the first camera frame are in
+        # (or the camera is off).
+        if not self.startup_timing or not self.collection_ready:
+            return
+        if self.camera_on and not self.first_frame_shown:
+            return
+        print(self.startup_timer.report())
+        self.startup_timing = False
+
+    def ensure_ready(self, whole_collection=False):
+        # Operations on the whole collection also wait for the pages that
+        # are still being loaded.
+        ready = self.collection_ready and not (whole_collection and self.store.loading())
+        if not ready:
+            self.update_status("Still loading the collection...", "yellow")
+        return ready
+
     
     def new_file(self):
+        if not self.ensure_ready(whole_collection=True):
+            return
+
         # Clear the current list and details
         self.scanned_books.clear()
-        self.book_list.clear()
+        self.store.record_clear()
+        self.scan_queue.clear()
+        self.show_book_list()
         self.details_text.clear()
         self.update_status("New file created", "green")
 
     def import_file(self):
+        if not self.ensure_ready(whole_collection=True):
+            return
+
         options = QFileDialog.Options()
         file_name, _ = QFileDialog.getOpenFileName(self, "Import CSV File", "", "CSV Files (*.csv);;All Files (*)", options=options)
         if file_name:
             # Load scanned books from the selected file
             try:
-                with open(file_name, 'r', newline='', encoding='utf-8') as csvfile:
-                    reader = csv.DictReader(csvfile)
-                    self.scanned_books.clear()
-                    self.book_list.clear()
-                    for row in reader:
-                        self.scanned_books.append({
-                            'isbn': row['isbn'],
-                            'details': {
-                                'Title': row['title'],
-                                'Author': row['author'],
-                                'Publisher': row['publisher'],
-                                'Edition': row['publish_date'],
-                                'Description': row['description'],
-                                'Pages': row['pages'],
-                                'Genre': row['genre'],
-                                'Language': row['language']
-                            },
-                            'timestamp': row['timestamp']
-                        })
-                        self.book_list.addItem(f"{row['isbn']} - {row['title']}")
+                books = list(read_books_csv(file_name))
+                self.scanned_books.clear()
+                self.scan_queue.clear()
+                for book in books:
+                    self.scanned_books.add(book['isbn'], book['details'], book['timestamp'])
+                self.show_book_list()
+                self.save_scanned_books()
                 self.update_status("Imported file successfully", "green")
             except IOError as e:
+                METRICS.inc('errors_total', stage='import')
                 print(f"Error importing file: {e}")
                 self.update_status("Error importing file", "red")
 
     def export_file(self):
+        if not self.ensure_ready(whole_collection=True):
+            return
+
         options = QFileDialog.Options()
         file_name, _ = QFileDialog.getSaveFileName(self, "Export CSV File", "", "CSV Files (*.csv);;All Files (*)", options=options)
         if file_name:
             # Save scanned books to the selected file
             try:
-                with open(file_name, 'w', newline='', encoding='utf-8') as csvfile:
-                    fieldnames = ['isbn', 'title', 'author', 'publisher', 'publish_date', 'description', 'pages', 'genre', 'language', 'timestamp']
-                    writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                    writer.writeheader()
-                    for book in self.scanned_books:
-                        writer.writerow({
-                            'isbn': book['isbn'],
-                            'title': book['details']['Title'],
-                            'author': book['details']['Author'],
-                            'publisher': book['details']['Publisher'],
-                            'publish_date': book['details']['Edition'],
-                            'description': book['details']['Description'],
-                            'pages': book['details']['Pages'],
-                            'genre': book['details']['Genre'],
-                            'language': book['details']['Language'],
-                            'timestamp': book['timestamp']
-                        })
+                write_books_csv(file_name, self.scanned_books)
                 self.update_status("Exported file successfully", "green")
             except IOError as e:
+                METRICS.inc('errors_total', stage='export')
                 print(f"Error exporting file: {e}")
                 self.update_status("Error exporting file", "red")
 
     def open_isbn_converter(self):
         try:
-            subprocess.Popen(["python", "assets/tools/isbn_converter.py"])
+            # Imported and built on first use, then the same window is reused.
+            if self.isbn_converter is None:
+                converter_module = importlib.import_module("assets.tools.isbn_converter")
+                self.isbn_converter = converter_module.ISBNConverter()
+            self.isbn_converter.show()
+            self.isbn_converter.raise_()
+            self.isbn_converter.activateWindow()
             self.update_status("ISBN Converter opened", "green")
         except Exception as e:
             print(f"Error opening ISBN Converter: {e}")
             self.update_status("Error opening ISBN Converter", "red")
 
+    def refresh_book_details(self):
+        if not self.ensure_ready(whole_collection=True):
+            return
+
+        isbns = self.scanned_books.isbns()
+        if not isbns:
+            self.update_status("No books to refresh", "yellow")
+            return
+        self.lookup_service.lookup_many(isbns, "REFRESH", refresh=True)
+        self.update_status(f"Refreshing details for {len(isbns)} books...")
+
+    def handle_batch_finished(self, results, source):
+        refreshed = 0
+        for isbn, book_details in results.items():
+            if book_details and self.scanned_books.update(isbn, book_details):
+                self.store.record_update(isbn, book_details)
+                self.scan_queue.remove(isbn)
+                refreshed += 1
+        self.store.maybe_compact(self.scanned_books)
+        if self.searching:
+            self.apply_search()
+        else:
+            self.book_model.refresh()
+        self.update_status(f"Refreshed details for {refreshed} of {len(results)} books", "green")
+
+    def show_cache_stats(self):
+        stats = get_metadata_cache().stats()
+        self.details_text.clear()
+        self.details_text.append("Metadata Cache")
+        self.details_text.append(f"Entries: {stats['size']} / {stats['max_entries']}")
+        self.details_text.append(f"Hits: {stats['hits']}")
+        self.details_text.append(f"Not-found hits: {stats['negative_hits']}")
+        self.details_text.append(f"Misses: {stats['misses']}")
+        self.details_text.append(f"Evictions: {stats['evictions']}")
+        self.details_text.append(f"Hit rate: {stats['hit_rate']:.1%}")
+
+        if self.scan_queue:
+            queue_stats = self.scan_queue.stats()
+            self.details_text.append("")
+            self.details_text.append("Pending Lookups")
+            self.details_text.append(f"Pending: {queue_stats['pending']}")
+            self.details_text.append(f"Failed attempts: {queue_stats['attempts']}")
+            self.details_text.append(f"Oldest: {queue_stats['oldest_seconds']:.0f} s")
+
+    def retry_pending_lookups(self):
+        if not self.ensure_ready():
+            return
+
+        pending = len(self.scan_queue)
+        if not pending:
+            self.update_status("No pending lookups", "yellow")
+            return
+        self.queue_resolver.retry_now()
+        self.update_status(f"Retrying {pending} pending lookups...")
+
+    def select_decoder(self, name):
+        from decoding import set_backend
+
+        set_backend(name)
+        self.update_status(f"Using {name} decoder", "green")
+
+    def toggle_enhancement(self, enabled):
+        # Decoding preprocessed variants of frames the plain sweep missed costs
+        # extra CPU, so it is off unless asked for.
+        if self.variant_decoder is None:
+            from decoding import VariantDecoder
+            self.variant_decoder = VariantDecoder()
+        self.enhancement_enabled = enabled
+        for station in self.stations:
+            station.decoder.preprocessor = self.variant_decoder if enabled else None
+        self.update_status("Frame enhancement " + ("enabled" if enabled else "disabled"), "green")
+
+    def calibrate_decoder(self):
+        frames = [frame for station in self.stations for frame in station.decode_worker.sample_frames()]
+        if not frames:
+            self.update_status("Calibration needs frames from the camera", "yellow")
+            return
+
+        from capture import CalibrationThread
+
+        self.calibration_thread = CalibrationThread(frames)
+        self.calibration_thread.calibrated.connect(self.handle_calibrated)
+        self.calibration_thread.start()
+        self.update_status("Calibrating decoders...")
+
+    def handle_calibrated(self, results):
+        from decoding import BACKENDS, get_backend
+
+        self.details_text.clear()
+        self.details_text.append("Decoder Calibration")
+        for result in results:
+            self.details_text.append(
+                f"{result['backend']}: {result['reads_per_second']:.1f} reads/s, "
+                f"{result['frames_per_second']:.1f} frames/s ({result['reads']} reads in {result['frames']} frames)"
+            )
+        for action in self.decoder_actions.actions():
+            action.setChecked(BACKENDS.get(action.text()) is get_backend())
+        if results:
+            self.update_status(f"Using {results[0]['backend']} decoder", "green")
+
+    def show_decoder_stats(self):
+        if not self.stations:
+            self.update_status("Camera is off", "yellow")
+            return
+
+        self.details_text.clear()
+        for station in self.stations:
+            stats = station.decoder.stats()
+            self.details_text.append(f"Barcode Decoder ({station.name})")
+            self.details_text.append(f"Frames: {stats['frames']} ({stats['skipped']} skipped as unchanged)")
+            self.details_text.append(f"Decode hit rate: {stats['hit_rate']:.1%}")
+            self.details_text.append(f"Region attempts: {stats['roi_attempts']} ({stats['roi_hit_rate']:.1%} hits)")
+            self.details_text.append(f"Full sweeps: {stats['sweep_attempts']} ({stats['sweep_hits']} hits)")
+            for stage, ms in stats['ms_per_frame'].items():
+                self.details_text.append(f"{stage}: {ms:.2f} ms/frame")
+            if 'preprocessing' in stats:
+                self.details_text.append(f"Enhanced frames: {stats['variant_attempts']} ({stats['variant_hits']} hits)")
+                for name, variant in stats['preprocessing']['variants'].items():
+                    self.details_text.append(f"  {name}: {variant['wins']} wins / {variant['attempts']} tries, {variant['ms']:.1f} ms")
+            self.details_text.append("")
+
     def add_isbn(self):
+        if not self.ensure_ready():
+            return
+
         isbn_type = self.isbn_type_dropdown.currentText()
-        isbn = self.isbn_input.text()
+        isbn = clean(self.isbn_input.text())
 
         if isbn:
             if isbn_type == "ISBN-10" and len(isbn) != 10:
                 self.update_status("Invalid ISBN-10 length", "red")
             elif isbn_type == "ISBN-13" and len(isbn) != 13:
                 self.update_status("Invalid ISBN-13 length", "red")
+            elif isbn_type == "ISBN-10" and not is_valid_isbn10(isbn):
+                self.update_status("Invalid ISBN-10 check digit", "red")
+            elif isbn_type == "ISBN-13" and not is_valid_isbn13(isbn):
+                self.update_status("Invalid ISBN-13", "red")
             else:
-                book_details = get_book_details(isbn)
-                if book_details:
-                    isbn_13 = book_details["ISBN-13"]
-                    if any(book['isbn'] == isbn_13 for book in self.scanned_books):
-                        self.update_status("Entry already exists", "yellow")
-                        self.play_sound("status_change")
-                        self.flash_status("yellow")
-                    else:
-                        self.show_book_details(isbn_13, book_details, "MANUAL ENTRY")
-                        self.scanned_books.append({
-                            'isbn': isbn_13,
-                            'details': book_details,
-                            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                        })
-                        self.save_scanned_books()
-                        self.update_status("Book added successfully", "green")
-                        self.play_sound("scan_success")
-                        self.flash_status("green")
-                        self.isbn_input.clear()
-                else:
-                    self.update_status("Invalid ISBN or no book found", "red")
-                    self.play_sound("scan_error")
-                    self.flash_status("red")
+                # Manual entries are looked up and stored as ISBN-13, like scans.
+                isbn_13 = to_isbn13(isbn)
+                if self.lookup_service.lookup(isbn_13, "MANUAL ENTRY"):
+                    self.update_status(f"Looking up {isbn_13}...")
         else:
             self.update_status("Please enter an ISBN", "red")
             self.flash_status("red")
 
     def update_isbn_info(self):
-        isbn = self.isbn_input.text()
+        isbn = clean(self.isbn_input.text())
         char_count = len(isbn)
         self.char_count_label.setText(str(char_count))
         
@@ -370,25 +611,153 @@ class ISBNScanner(QMainWindow):
 
         self.setStyleSheet(style_sheet)
 
-    def decode_barcodes(self, frame):
-        try:
-            return decode(frame, symbols=[ZBarSymbol.EAN13])
-        except Exception as e:
-            print(f"Error decoding barcodes: {e}")
-            return []
+    def start_camera(self):
+        from capture import CameraStation
+        from preview import PreviewRenderer
+
+        # Per camera, capture and decode each run in their own thread,
+        # connected by a small drop-oldest queue; results come back to the GUI
+        # thread as signals, where scans from every camera meet one collection.
+        self.build_preview_grid(len(self.camera_sources))
+        for source in self.camera_sources:
+            station = CameraStation(source, is_known=lambda isbn: isbn in self.scanned_books)
+            station.renderer = PreviewRenderer()
+            station.capture_thread.camera_error.connect(self.handle_camera_error)
+            if self.enhancement_enabled:
+                station.decoder.preprocessor = self.variant_decoder
+            station.decode_worker.barcodes_decoded.connect(
+                lambda barcodes, fresh, station=station: self.handle_barcodes(station, barcodes, fresh)
+            )
+            self.stations.append(station)
+            station.start()
+        self.preview_timer.start(int(1000 / PREVIEW_FPS))
+        self.throughput_rates.rates(THROUGHPUT_COUNTERS)
+        self.throughput_timer.start(METRICS_OVERLAY_MS)
+
+    def stop_camera(self):
+        self.preview_timer.stop()
+        self.throughput_timer.stop()
+        self.throughput_label.clear()
+        for station in self.stations:
+            station.stop()
+        self.stations = []
+
+    def build_preview_grid(self, count):
+        # Splits the preview area into a near-square grid of `count` labels.
+        for label in self.video_labels:
+            self.preview_grid.removeWidget(label)
+            label.deleteLater()
+
+        columns = math.ceil(math.sqrt(count))
+        rows = math.ceil(count / columns)
+        width, height = PREVIEW_SIZE[0] // columns, PREVIEW_SIZE[1] // rows
+        self.video_labels = []
+        for position in range(count):
+            label = QLabel(self.preview_widget)
+            label.setFixedSize(width, height)
+            label.setAlignment(Qt.AlignCenter)
+            self.preview_grid.addWidget(label, position // columns, position % columns)
+            self.video_labels.append(label)
+        self.video_label = self.video_labels[0]
+        self.metrics_overlay.raise_()
+
+    def edit_camera_sources(self):
+        text, ok = QInputDialog.getText(
+            self, "Camera Sources", "Device numbers, video files or stream URLs, separated by commas:",
+            text=", ".join(str(source) for source in self.camera_sources)
+        )
+        if not ok:
+            return
+
+        from capture import parse_source
+
+        sources = [parse_source(source) for source in text.split(',') if source.strip()]
+        if not sources:
+            self.update_status("At least one camera source is needed", "red")
+            return
+        self.camera_sources = sources
+        if self.camera_on and self.camera_ready:
+            self.stop_camera()
+            self.start_camera()
+        self.update_status(f"Using {len(sources)} camera source{'s' if len(sources) > 1 else ''}", "green")
+
+    def update_throughput(self):
+        # Frames per second summed over all cameras, and confirmed scans per
+        # minute, since the last update.
+        rates = self.throughput_rates.rates(THROUGHPUT_COUNTERS)
+        self.throughput_label.setText(
+            f"{len(self.stations)} camera{'s' if len(self.stations) != 1 else ''}: "
+            f"{rates['captured']:.1f} frames/s captured, {rates['decoded']:.1f} decoded, "
+            f"{rates['scans'] * 60:.0f} scans/min"
+        )
+
+    def toggle_metrics_overlay(self, enabled):
+        if enabled:
+            self.metrics_rates.rates()
+            self.update_metrics_overlay()
+            self.metrics_overlay.show()
+            self.metrics_timer.start(METRICS_OVERLAY_MS)
+        else:
+            self.metrics_timer.stop()
+            self.metrics_overlay.hide()
+
+    def update_metrics_overlay(self):
+        figures = summary(METRICS, self.metrics_rates.rates())
+
+        def ms(stats, key='p95'):
+            return f"{stats[key] * 1000:.1f}" if stats else "-"
+
+        rates = figures['frames_per_second']
+        lines = [
+            f"fps  capture {rates['captured']:.1f}  decode {rates['decoded']:.1f}  render {rates['rendered']:.1f}",
+            f"decode hit rate {figures['decode_hit_rate']:.0%}  cache hit rate {figures['cache_hit_rate']:.0%}",
+            f"p95 ms  capture {ms(figures['capture'])}  color {ms(figures['color_conversion'])}  "
+            f"decode {ms(figures['decode'])}  render {ms(figures['render'])}"
+        ]
+        for provider, stats in sorted(figures['lookup'].items()):
+            lines.append(f"{provider} ms  p50 {ms(stats, 'p50')}  p95 {ms(stats, 'p95')}  p99 {ms(stats, 'p99')}")
+        for operation, stats in sorted(figures['persistence'].items()):
+            lines.append(f"save {operation} ms  p50 {ms(stats, 'p50')}  p95 {ms(stats, 'p95')}")
+        if figures['errors']:
+            lines.append(f"errors {figures['errors']}")
+        self.metrics_overlay.setText("\n".join(lines))
+        self.metrics_overlay.adjustSize()
+
+    def handle_camera_error(self, message):
+        print(message)
+        self.update_status(message, "red")
 
     def toggle_camera(self):
         self.camera_on = not self.camera_on
+        if not self.camera_ready:
+            # The camera starts once its modules are loaded, if still on.
+            return
         if self.camera_on:
-            self.cap.open(0)
-            self.timer.start(10)
-            self.video_label.clear()
+            self.start_camera()
         else:
-            self.cap.release()
-            self.timer.stop()
+            self.stop_camera()
             self.show_camera_off_icon()
 
+    def closeEvent(self, event):
+        self.stop_camera()
+        self.page_timer.stop()
+        self.lookup_service.shutdown()
+        # Hits only record their time in memory until flushed.
+        get_metadata_cache().flush()
+        if self.queue_resolver:
+            self.queue_resolver.stop()
+            self.queue_resolver.wait()
+            self.scan_queue.close()
+        self.sound_executor.shutdown(wait=False, cancel_futures=True)
+        if self.variant_decoder:
+            self.variant_decoder.shutdown()
+        self.startup_thread.wait()
+        if self.store:
+            self.store.close()
+        super().closeEvent(event)
+
     def show_camera_off_icon(self):
+        self.build_preview_grid(1)
         pixmap = QPixmap('assets/images/camera_off.png')
         self.video_label.setPixmap(pixmap)
         self.video_label.setAlignment(Qt.AlignCenter)
@@ -397,49 +766,126 @@ class ISBNScanner(QMainWindow):
         if not self.camera_on:
             return
 
-        ret, frame = self.cap.read()
-        if ret:
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            barcodes = self.decode_barcodes(frame)
-
-            for barcode in barcodes:
-                (x, y, w, h) = barcode.rect
-                cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
-
-                barcode_data = barcode.data.decode('utf-8')
-                barcode_type = barcode.type
-
-                if barcode_type != "EAN13":
-                    continue
-
-                text = f"{barcode_data} ({barcode_type})"
-
-                if any(book['isbn'] == barcode_data for book in self.scanned_books):
-                    self.update_status("Entry already exists")
-                    self.play_sound("status_change")
-                    self.flash_status("yellow")
-                else:
-                    book_details = get_book_details(barcode_data)
-                    if book_details:
-                        self.show_book_details(barcode_data, book_details)
-                        self.scanned_books.append({
-                            'isbn': barcode_data,
-                            'details': book_details,
-                            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                        })
-                        self.save_scanned_books()
-                        self.play_sound("scan_success")
-                        self.flash_status("green")
-                    else:
-                        self.update_status("Invalid barcode")
-                        self.play_sound("scan_error")
-                        self.flash_status("red")
-
-                cv2.putText(frame, text, (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-
-            img = QImage(frame, frame.shape[1], frame.shape[0], frame.strides[0], QImage.Format_RGB888)
-            pix = QPixmap.fromImage(img)
-            self.video_label.setPixmap(pix)
+        rendered = False
+        for station, label in zip(self.stations, self.video_labels):
+            frame_index, frame = station.capture_thread.latest_frame()
+            if frame is None or (frame_index == station.rendered_index and not station.overlay_changed):
+                continue
+
+            with METRICS.timer('render_seconds'):
+                pix = station.renderer.render(frame, station.last_barcodes, label.width(), label.height())
+                label.setPixmap(pix)
+            METRICS.inc('frames_rendered_total')
+            station.rendered_index = frame_index
+            station.overlay_changed = False
+            rendered = True
+
+        if rendered and not self.first_frame_shown:
+            self.first_frame_shown = True
+            self.startup_timer.mark("first frame shown")
+            self.report_startup_timing()
+
+    def handle_barcodes(self, station, barcodes, fresh=True):
+        if not self.camera_on:
+            return
+
+        station.last_barcodes = barcodes
+        station.overlay_changed = True
+
+        if not self.collection_ready:
+            return
+
+        isbns = [barcode.data.decode('utf-8') for barcode in barcodes if barcode.type == "EAN13"]
+
+        # Only confirmed, once-per-physical-scan events reach the handlers.
+        # Events from all cameras are handled here on the GUI thread, one at
+        # a time, so a book shown to two cameras is only added once.
+        for event in station.scan_filter.update(isbns, fresh=fresh):
+            METRICS.inc('scan_events_total', status=event.status, camera=station.name)
+            if event.status == "duplicate":
+                self.update_status("Entry already exists")
+                self.play_sound("status_change")
+                self.flash_status("yellow")
+            elif event.status == "invalid":
+                self.update_status("Invalid barcode")
+                self.play_sound("scan_error")
+                self.flash_status("red")
+            else:
+                self.add_pending_scan(event.isbn)
+
+    def add_pending_scan(self, isbn):
+        book = self.scanned_books.add(isbn, pending_details())
+        if self.searching:
+            self.apply_search()
+        else:
+            self.book_model.append([isbn])
+        self.store.record_add(book)
+        self.store.maybe_compact(self.scanned_books)
+
+        self.scan_queue.add(isbn, "SCANNED")
+        self.queue_resolver.wake()
+        self.process_log.append(f"PENDING: {isbn}")
+        self.update_status(f"Looking up {isbn}...")
+        self.play_sound("scan_success")
+        self.flash_status("green")
+
+    def handle_queued_lookup(self, isbn, book_details, source):
+        if isbn not in self.scanned_books:
+            # Deleted while it was pending.
+            return
+
+        if book_details:
+            self.scanned_books.update(isbn, book_details)
+            self.store.record_update(isbn, book_details)
+            self.show_book_details(isbn, book_details, source)
+            self.update_status(f"Found {book_details['Title']}", "green")
+        else:
+            # Not a book any provider knows; the scan is dropped as before.
+            self.scanned_books.remove(isbn)
+            self.store.record_delete(isbn)
+            self.process_log.append(f"NOT FOUND: {isbn}")
+            self.update_status(f"No book found for {isbn}", "red")
+            self.play_sound("scan_error")
+            if not self.searching:
+                self.book_model.remove([isbn])
+        self.store.maybe_compact(self.scanned_books)
+
+        if self.searching:
+            self.apply_search()
+        elif book_details:
+            self.book_model.refresh()
+
+    def handle_lookup_deferred(self, isbn, attempts, delay):
+        self.update_status(f"Lookups pending ({len(self.scan_queue)}), retrying in {delay:.0f} s", "yellow")
+
+    def handle_lookup_finished(self, isbn, book_details, sources):
+        # Only manual entries are looked up directly (by ISBN-13); scans go
+        # through the scan queue and handle_queued_lookup().
+        if not book_details:
+            self.update_status("Invalid ISBN or no book found", "red")
+            self.play_sound("scan_error")
+            self.flash_status("red")
+            return
+
+        if isbn in self.scanned_books:
+            self.update_status("Entry already exists", "yellow")
+            self.play_sound("status_change")
+            self.flash_status("yellow")
+            return
+
+        self.show_book_details(isbn, book_details, "MANUAL ENTRY")
+        book = self.scanned_books.add(isbn, book_details)
+        if self.searching:
+            self.apply_search()
+        else:
+            self.book_model.append([isbn])
+        self.store.record_add(book)
+        self.store.maybe_compact(self.scanned_books)
+        self.update_status("Book added successfully", "green")
+        if to_isbn13(self.isbn_input.text()) == isbn:
+            self.isbn_input.clear()
+        self.play_sound("scan_success")
+        self.flash_status("green")
 
 
     def flash_status(self, color):
@@ -467,11 +913,10 @@ class ISBNScanner(QMainWindow):
         self.details_text.append(f"Genre: {book_details['Genre']}")
         self.details_text.append(f"Language: {book_details['Language']}")
 
-        self.book_list.addItem(f"{isbn} - {book_details['Title']}")
-        self.process_list.addItem(f"{source}: {isbn} - {book_details['Title']}")
+        self.process_log.append(f"{source}: {isbn} - {book_details['Title']}")
 
     def display_selected_book_details(self, isbn):
-        book = next((book for book in self.scanned_books if book['isbn'] == isbn), None)
+        book = self.scanned_books.get(isbn)
         if book:
             self.details_text.clear()
             self.details_text.append(f"Title: {book['details']['Title']}")
@@ -488,85 +933,113 @@ class ISBNScanner(QMainWindow):
         self.flash_status(color)
 
     def delete_selected_book(self):
-        selected_item = self.book_list.currentItem()
-        if not selected_item:
+        if not self.ensure_ready():
+            return
+
+        isbn = self.book_model.isbn_at(self.book_list.currentIndex().row())
+        if not isbn:
             self.update_status("No book selected")
             self.flash_status("red")
             return
 
-        isbn = selected_item.text().split(' - ')[0]
-        self.scanned_books = [book for book in self.scanned_books if book['isbn'] != isbn]
-        self.save_scanned_books()
+        if self.scanned_books.remove(isbn):
+            self.store.record_delete(isbn)
+            self.store.maybe_compact(self.scanned_books)
+        self.scan_queue.remove(isbn)
 
-        self.book_list.takeItem(self.book_list.row(selected_item))
+        if self.searching:
+            self.apply_search()
+        else:
+            self.book_model.remove([isbn])
         self.details_text.clear()
         self.update_status(f"Deleted book with ISBN: {isbn}")
         self.flash_status("green")
 
     def save_scanned_books(self):
+        # Writes a fresh snapshot and discards the journal; single changes are
+        # journaled through self.store instead.
         try:
-            with open('assets/data/scanned_books.csv', 'w', newline='', encoding='utf-8') as csvfile:
-                fieldnames = ['isbn', 'title', 'author', 'publisher', 'publish_date', 'description', 'pages', 'genre', 'language', 'timestamp']
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writeheader()
-                for book in self.scanned_books:
-                    writer.writerow({
-                        'isbn': book['isbn'],
-                        'title': book['details']['Title'],
-                        'author': book['details']['Author'],
-                        'publisher': book['details']['Publisher'],
-                        'publish_date': book['details']['Edition'],
-                        'description': book['details']['Description'],
-                        'pages': book['details']['Pages'],
-                        'genre': book['details']['Genre'],
-                        'language': book['details']['Language'],
-                        'timestamp': book['timestamp']
-                    })
-        except IOError as e:
+            self.store.rewrite(self.scanned_books)
+        except (IOError, OSError, sqlite3.Error) as e:
+            METRICS.inc('errors_total', stage='persistence')
             print(f"Error saving scanned books: {e}")
 
     def load_scanned_books(self):
-        try:
-            with open('assets/data/scanned_books.csv', 'r', newline='', encoding='utf-8') as csvfile:
-                reader = csv.DictReader(csvfile)
-                for row in reader:
-                    self.scanned_books.append({
-                        'isbn': row['isbn'],
-                        'details': {
-                            'Title': row['title'],
-                            'Author': row['author'],
-                            'Publisher': row['publisher'],
-                            'Edition': row['publish_date'],
-                            'Description': row['description'],
-                            'Pages': row['pages'],
-                            'Genre': row['genre'],
-                            'Language': row['language']
-                        },
-                        'timestamp': row['timestamp']
-                    })
-                    self.book_list.addItem(f"{row['isbn']} - {row['title']}")
-        except FileNotFoundError:
-            pass
-        except IOError as e:
-            print(f"Error loading scanned books: {e}")
-
-    def display_selected_book_details_wrapper(self, item):
-        isbn = item.text().split(' - ')[0]
-        self.display_selected_book_details(isbn)
+        self.show_book_list()
+
+    def show_book_list(self):
+        # Shows the whole collection, or the current search results.
+        self.book_model.set_collection(self.scanned_books)
+        self.apply_search()
+
+    def apply_search(self):
+        text = self.search_input.text()
+        genre = self.genre_filter.currentData()
+
+        # Genre counts are for the text query alone, so the other genres stay
+        # selectable while one is chosen.
+        results = self.scanned_books.search(text)
+        self.update_genre_filter(self.scanned_books.facets(results, GENRE_FACETS)['Genre'], genre)
+        if genre:
+            results = self.scanned_books.search(text, {'Genre': genre})
+
+        if results is None:
+            if self.searching:
+                self.book_model.set_collection(self.scanned_books)
+            self.search_count_label.setText("")
+        else:
+            self.book_model.set_isbns(results)
+            self.search_count_label.setText(f"{len(results)} of {len(self.scanned_books)}")
+        self.searching = results is not None
+
+    def update_genre_filter(self, counts, selected):
+        self.genre_filter.blockSignals(True)
+        self.genre_filter.clear()
+        self.genre_filter.addItem("All genres", "")
+        for genre, count in counts:
+            self.genre_filter.addItem(f"{genre} ({count})", genre)
+        if selected and self.genre_filter.findData(selected) < 0:
+            self.genre_filter.addItem(f"{selected} (0)", selected)
+        self.genre_filter.setCurrentIndex(max(0, self.genre_filter.findData(selected)))
+        self.genre_filter.blockSignals(False)
+
+    def display_selected_book_details_wrapper(self, index):
+        isbn = self.book_model.isbn_at(index.row())
+        if isbn:
+            self.display_selected_book_details(isbn)
 
     def play_sound(self, sound_type):
         if sound_type == "scan_success":
-            winsound.Beep(1000, 200)
+            self.sound_executor.submit(winsound.Beep, 1000, 200)
         elif sound_type == "scan_error":
-            winsound.Beep(500, 400)
+            self.sound_executor.submit(winsound.Beep, 500, 400)
         elif sound_type == "status_change":
-            winsound.Beep(800, 300)
+            self.sound_executor.submit(winsound.Beep, 800, 300)
         else:
             print(f"Unknown sound type: {sound_type}")
 
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
-    scanner = ISBNScanner()
+    parser = argparse.ArgumentParser(description="ISBN barcode scanner")
+    parser.add_argument('--startup-timing', action='store_true', help="print a startup timing breakdown")
+    parser.add_argument('--metrics-port', type=int, help="serve Prometheus metrics on this local port")
+    parser.add_argument('--metrics-json', help="periodically write metrics to this JSON file")
+    parser.add_argument('--metrics-interval', type=float, default=10.0, help="seconds between JSON metrics dumps")
+    parser.add_argument('--camera', action='append', dest='cameras', metavar='SOURCE',
+                        help="camera device number, video file or stream URL; repeat for several cameras (default: 0)")
+    args, qt_args = parser.parse_known_args()
+
+    app = QApplication(sys.argv[:1] + qt_args)
+    exporters = []
+    if args.metrics_port:
+        exporters.append(MetricsServer(args.metrics_port).start())
+    if args.metrics_json:
+        exporters.append(JsonDumper(args.metrics_json, args.metrics_interval).start())
+
+    camera_sources = [int(source) if source.isdigit() else source for source in args.cameras or []]
+    scanner = ISBNScanner(startup_timing=args.startup_timing, camera_sources=camera_sources)
     scanner.show()
-    sys.exit(app.exec_())
+    status = app.exec_()
+    for exporter in exporters:
+        exporter.stop()
+    sys.exit(status)
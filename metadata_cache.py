@@ -0,0 +1,161 @@
+import json
+import sqlite3
+import threading
+import time
+
+from metrics import METRICS
+
+
+DEFAULT_CACHE_PATH = 'assets/data/metadata_cache.db'
+
+# Hits only update last_used in memory; the times are written out in one
+# transaction once this many are pending, before an eviction and on flush().
+TOUCH_BATCH = 256
+
+
+class MetadataCache:
+    # SQLite-backed cache of book details keyed by ISBN. Found books are kept
+    # for `ttl` seconds, "not found" results for the much shorter
+    # `negative_ttl`, and the least recently used rows are evicted once the
+    # cache holds more than `max_entries`. The row count is kept in memory so
+    # inserts don't have to count the table.
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=30 * 24 * 3600, negative_ttl=600, max_entries=50000):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.touched = {}
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS books (
+                isbn TEXT PRIMARY KEY,
+                details TEXT,
+                stored_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS books_last_used ON books (last_used)")
+        self.conn.commit()
+        self.size = self.conn.execute("SELECT COUNT(*) FROM books").fetchone()[0]
+
+    def get(self, isbn):
+        # Returns (hit, book_details); a hit with None details is a cached
+        # "not found" result.
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT details, stored_at FROM books WHERE isbn = ?", (isbn,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                METRICS.inc('cache_lookups_total', result='miss')
+                return False, None
+
+            details, stored_at = row
+            ttl = self.ttl if details is not None else self.negative_ttl
+            if now - stored_at > ttl:
+                self.conn.execute("DELETE FROM books WHERE isbn = ?", (isbn,))
+                self.conn.commit()
+                self.touched.pop(isbn, None)
+                self.size -= 1
+                self.misses += 1
+                METRICS.inc('cache_lookups_total', result='expired')
+                return False, None
+
+            self.touched[isbn] = now
+            if len(self.touched) >= TOUCH_BATCH:
+                self._write_touched()
+            if details is None:
+                self.negative_hits += 1
+                METRICS.inc('cache_lookups_total', result='negative_hit')
+                return True, None
+            self.hits += 1
+            METRICS.inc('cache_lookups_total', result='hit')
+            return True, json.loads(details)
+
+    def put(self, isbn, book_details):
+        now = time.time()
+        details = json.dumps(book_details) if book_details is not None else None
+        with self.lock:
+            exists = self.conn.execute("SELECT 1 FROM books WHERE isbn = ?", (isbn,)).fetchone() is not None
+            self.conn.execute(
+                "INSERT OR REPLACE INTO books (isbn, details, stored_at, last_used) VALUES (?, ?, ?, ?)",
+                (isbn, details, now, now)
+            )
+            self.touched.pop(isbn, None)
+            if not exists:
+                self.size += 1
+            self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        excess = self.size - self.max_entries
+        if excess > 0:
+            # Pending hits decide which rows are least recently used.
+            self._write_touched()
+            self.conn.execute(
+                "DELETE FROM books WHERE isbn IN (SELECT isbn FROM books ORDER BY last_used LIMIT ?)",
+                (excess,)
+            )
+            self.size -= excess
+            self.evictions += excess
+
+    def _write_touched(self):
+        if not self.touched:
+            return
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE books SET last_used = ? WHERE isbn = ?",
+                [(used, isbn) for isbn, used in self.touched.items()]
+            )
+        self.touched.clear()
+
+    def flush(self):
+        with self.lock:
+            self._write_touched()
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM books")
+            self.conn.commit()
+            self.touched.clear()
+            self.size = 0
+
+    def stats(self):
+        with self.lock:
+            size = self.size
+            lookups = self.hits + self.negative_hits + self.misses
+            return {
+                'hits': self.hits,
+                'negative_hits': self.negative_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': size,
+                'max_entries': self.max_entries,
+                'hit_rate': (self.hits + self.negative_hits) / lookups if lookups else 0.0
+            }
+
+    def close(self):
+        with self.lock:
+            self._write_touched()
+            self.conn.close()
+
+
+_metadata_cache = None
+_metadata_cache_lock = threading.Lock()
+
+
+def get_metadata_cache():
+    global _metadata_cache
+    with _metadata_cache_lock:
+        if _metadata_cache is None:
+            _metadata_cache = MetadataCache()
+        return _metadata_cache
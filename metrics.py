@@ -0,0 +1,291 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# Counters shown as per-second rates, by the name they are shown under.
+FRAME_COUNTERS = {
+    'captured': 'frames_captured_total',
+    'decoded': 'frames_decoded_total',
+    'rendered': 'frames_rendered_total'
+}
+
+# Latency bucket bounds in seconds: 50µs to about 37s in steps of √2, so an
+# interpolated quantile is off by less than a factor of √2.
+BUCKETS = tuple(float(f"{0.00005 * 2 ** (step / 2):.3g}") for step in range(40))
+
+
+class Histogram:
+    # Cumulative-bucket histogram, as in the Prometheus exposition format.
+    # Quantiles are interpolated within the bucket they fall in.
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+class Metrics:
+    # Counters and latency histograms for the scan pipeline, keyed by name and
+    # a sorted tuple of (label, value) pairs. Safe to update from any thread;
+    # each update is a dict lookup and a few additions under one lock.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.started = time.time()
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def counter(self, name, **labels):
+        with self.lock:
+            return self.counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def total(self, name):
+        # Sum of a counter over all label values.
+        with self.lock:
+            return sum(value for (counter, _), value in self.counters.items() if counter == name)
+
+    def snapshot(self):
+        # Plain-data copy: counters, and count/sum/p50/p95/p99 per histogram.
+        with self.lock:
+            counters = [
+                {'name': name, 'labels': dict(labels), 'value': value}
+                for (name, labels), value in sorted(self.counters.items())
+            ]
+            histograms = [
+                {
+                    'name': name,
+                    'labels': dict(labels),
+                    'count': histogram.count,
+                    'sum': histogram.sum,
+                    'p50': histogram.quantile(0.5),
+                    'p95': histogram.quantile(0.95),
+                    'p99': histogram.quantile(0.99)
+                }
+                for (name, labels), histogram in sorted(self.histograms.items())
+            ]
+        return {'time': time.time(), 'uptime': time.time() - self.started, 'counters': counters, 'histograms': histograms}
+
+    def histogram_stats(self, name, **labels):
+        with self.lock:
+            histogram = self.histograms.get((name, tuple(sorted(labels.items()))))
+            if histogram is None:
+                return None
+            return {
+                'count': histogram.count,
+                'p50': histogram.quantile(0.5),
+                'p95': histogram.quantile(0.95),
+                'p99': histogram.quantile(0.99)
+            }
+
+    def histogram_labels(self, name):
+        with self.lock:
+            return [dict(labels) for (histogram, labels) in self.histograms if histogram == name]
+
+    def render_prometheus(self):
+        lines = []
+        with self.lock:
+            for name in sorted({name for name, _ in self.counters}):
+                lines.append(f"# TYPE {name} counter")
+                for (counter, labels), value in sorted(self.counters.items()):
+                    if counter == name:
+                        lines.append(f"{name}{_labels(labels)} {value}")
+            for name in sorted({name for name, _ in self.histograms}):
+                lines.append(f"# TYPE {name} histogram")
+                for (histogram_name, labels), histogram in sorted(self.histograms.items()):
+                    if histogram_name != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_labels(labels + (('le', repr(bound)),))} {cumulative}")
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {histogram.count}")
+                    lines.append(f"{name}_sum{_labels(labels)} {histogram.sum}")
+                    lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Process-wide registry the pipeline stages report to.
+METRICS = Metrics()
+
+
+class RateTracker:
+    # Per-second rates of counters between successive calls to rates().
+    def __init__(self, metrics=METRICS):
+        self.metrics = metrics
+        self.previous = {}
+        self.previous_time = None
+
+    def rates(self, counters=FRAME_COUNTERS):
+        # {shown name: per-second rate} for a {shown name: counter} mapping.
+        now = time.perf_counter()
+        current = {name: self.metrics.total(counter) for name, counter in counters.items()}
+        elapsed = now - self.previous_time if self.previous_time else 0.0
+        rates = {
+            name: (value - self.previous.get(name, 0)) / elapsed if elapsed else 0.0
+            for name, value in current.items()
+        }
+        self.previous = current
+        self.previous_time = now
+        return rates
+
+
+def summary(metrics=METRICS, rates=None):
+    # The headline figures shown in the overlay and written to the JSON dump.
+    quantiles = metrics.histogram_stats
+
+    hits = metrics.counter('frames_decoded_total', result='hit')
+    decoded = hits + metrics.counter('frames_decoded_total', result='miss')
+    cache_hits = metrics.counter('cache_lookups_total', result='hit') + metrics.counter('cache_lookups_total', result='negative_hit')
+    cache_lookups = metrics.total('cache_lookups_total')
+    return {
+        'frames_per_second': dict(rates or {}),
+        'decode_hit_rate': hits / decoded if decoded else 0.0,
+        'cache_hit_rate': cache_hits / cache_lookups if cache_lookups else 0.0,
+        'capture': quantiles('capture_seconds'),
+        'color_conversion': quantiles('color_conversion_seconds'),
+        'decode': quantiles('decode_seconds'),
+        'decode_stages': {labels['stage']: quantiles('decode_stage_seconds', **labels)
+                          for labels in metrics.histogram_labels('decode_stage_seconds')},
+        'render': quantiles('render_seconds'),
+        'lookup': {labels['provider']: quantiles('provider_request_seconds', **labels)
+                   for labels in metrics.histogram_labels('provider_request_seconds')},
+        'persistence': {labels['operation']: quantiles('persistence_seconds', **labels)
+                        for labels in metrics.histogram_labels('persistence_seconds')},
+        'errors': metrics.total('errors_total')
+    }
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == '/metrics':
+            body = self.server.metrics.render_prometheus().encode('utf-8')
+            content_type = 'text/plain; version=0.0.4; charset=utf-8'
+        elif self.path == '/metrics.json':
+            body = json.dumps(self.server.metrics.snapshot()).encode('utf-8')
+            content_type = 'application/json'
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsServer:
+    # Serves /metrics (Prometheus text format) and /metrics.json on a
+    # loopback port from a daemon thread.
+    def __init__(self, port, metrics=METRICS, host='127.0.0.1'):
+        self.server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        self.server.daemon_threads = True
+        self.server.metrics = metrics
+        self.thread = threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True)
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class JsonDumper:
+    # Rewrites `path` every `interval` seconds with the summary and a full
+    # snapshot, replacing the file atomically so readers never see half.
+    def __init__(self, path, interval=10.0, metrics=METRICS):
+        self.path = path
+        self.interval = interval
+        self.metrics = metrics
+        self.rates = RateTracker(metrics)
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._loop, name="metrics-dump", daemon=True)
+
+    def start(self):
+        self.rates.rates()
+        self.thread.start()
+        return self
+
+    def _loop(self):
+        while not self.stop_event.wait(self.interval):
+            self.dump()
+
+    def dump(self):
+        data = {
+            'summary': summary(self.metrics, self.rates.rates()),
+            'snapshot': self.metrics.snapshot()
+        }
+        temp_path = self.path + '.tmp'
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as dump:
+                json.dump(data, dump, indent=1)
+            os.replace(temp_path, self.path)
+        except (IOError, OSError) as e:
+            print(f"Error writing metrics: {e}")
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+        self.dump()
+
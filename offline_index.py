@@ -0,0 +1,321 @@
+import argparse
+import gzip
+import heapq
+import json
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import threading
+import time
+from bisect import bisect_right
+
+from collection import read_books_csv
+from isbn import to_isbn13
+from metrics import METRICS
+
+
+DEFAULT_INDEX_PATH = 'assets/data/offline_index.bin'
+
+# File layout: a header, the book records (tab-separated UTF-8, one after
+# another), a table of fixed-size entries sorted by ISBN-13, each pointing at
+# its record, and every FENCE_INTERVAL-th ISBN of the table. Only the fence
+# keys are read into memory; a lookup bisects them to find one block of
+# entries and searches that block in the memory-mapped file.
+MAGIC = b'ISBNIDX1'
+HEADER = struct.Struct('<8sIIQQQQ')
+ENTRY = struct.Struct('<13sQI')
+KEY_SIZE = 13
+FENCE_INTERVAL = 128
+
+# Fields of a record, in the order they are stored.
+RECORD_FIELDS = ('Title', 'Author', 'Publisher', 'Edition', 'Pages', 'Genre', 'Language', 'Description')
+
+# Records sorted in memory per run while building; each run is one
+# temporary file, merged at the end.
+RUN_SIZE = 200000
+
+
+class OfflineIndex:
+    # Read-only lookups in an index file written by build_index(). Memory use
+    # is the fence keys (one in FENCE_INTERVAL ISBNs) and whatever pages of
+    # the file the OS keeps cached.
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        self.path = path
+        self.file = open(path, 'rb')
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # mmap refuses empty files.
+            self.file.close()
+            raise ValueError(f"{path} is not an offline index")
+
+        magic, _, self.fence_interval, self.count, _, self.entries_offset, fence_offset = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not an offline index")
+        fence_count = (self.count + self.fence_interval - 1) // self.fence_interval
+        self.fence = [
+            self.map[fence_offset + i * KEY_SIZE:fence_offset + (i + 1) * KEY_SIZE]
+            for i in range(fence_count)
+        ]
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, isbn):
+        return self._find(isbn) is not None
+
+    def _find(self, isbn):
+        # Position of the entry for `isbn` in the entry table, or None.
+        key = isbn.encode('ascii', 'replace')
+        block = bisect_right(self.fence, key) - 1
+        if block < 0:
+            return None
+
+        lo = block * self.fence_interval
+        hi = min(lo + self.fence_interval, self.count)
+        data = self.map
+        base = self.entries_offset
+        size = ENTRY.size
+        while lo < hi:
+            middle = (lo + hi) // 2
+            position = base + middle * size
+            if data[position:position + KEY_SIZE] < key:
+                lo = middle + 1
+            else:
+                hi = middle
+        position = base + lo * size
+        if lo < self.count and data[position:position + KEY_SIZE] == key:
+            return position
+        return None
+
+    def get(self, isbn):
+        # Book details in the form the providers return, or None.
+        position = self._find(isbn)
+        if position is None:
+            METRICS.inc('offline_index_lookups_total', result='miss')
+            return None
+
+        _, offset, length = ENTRY.unpack_from(self.map, position)
+        values = self.map[offset:offset + length].decode('utf-8').split('\t')
+        METRICS.inc('offline_index_lookups_total', result='hit')
+        book_details = {'ISBN-13': isbn}
+        book_details.update(zip(RECORD_FIELDS, values))
+        return book_details
+
+    def close(self):
+        if getattr(self, 'map', None) is not None:
+            self.map.close()
+        self.file.close()
+
+
+def _field(value):
+    if value is None or value == '':
+        return 'N/A'
+    return str(value).replace('\t', ' ').replace('\r', ' ').replace('\n', ' ')
+
+
+def _record(details):
+    return '\t'.join(_field(details.get(field)) for field in RECORD_FIELDS)
+
+
+def _text(value):
+    # Open Library writes descriptions and notes either as a string or as
+    # {"type": "/type/text", "value": ...}.
+    if isinstance(value, dict):
+        return value.get('value')
+    return value
+
+
+def open_library_record(edition):
+    # (isbn13s, details) of one edition from an Open Library editions dump.
+    # Editions name authors only by key, so the "by" statement stands in for
+    # the author when there is one.
+    isbns = []
+    for isbn in edition.get('isbn_13', []) + edition.get('isbn_10', []):
+        isbn = to_isbn13(str(isbn))
+        if isbn and isbn not in isbns:
+            isbns.append(isbn)
+
+    title = edition.get('title')
+    if title and edition.get('subtitle'):
+        title = f"{title}: {edition['subtitle']}"
+    publishers = edition.get('publishers') or []
+    subjects = edition.get('subjects') or []
+    languages = edition.get('languages') or []
+    details = {
+        'Title': title,
+        'Author': (edition.get('by_statement') or '').rstrip('.') or None,
+        'Publisher': publishers[0] if publishers else None,
+        'Edition': edition.get('publish_date'),
+        'Pages': edition.get('number_of_pages'),
+        'Genre': subjects[0] if subjects and isinstance(subjects[0], str) else None,
+        'Language': languages[0]['key'].split('/')[-1] if languages and isinstance(languages[0], dict) else None,
+        'Description': _text(edition.get('description')) or _text(edition.get('notes'))
+    }
+    return isbns, details
+
+
+def read_open_library_dump(path):
+    # Editions dumps are tab-separated (type, key, revision, modified, JSON);
+    # plain JSON-lines files are read too.
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as dump:
+        for line in dump:
+            document = line.rsplit('\t', 1)[-1]
+            if not document.startswith('{'):
+                continue
+            try:
+                edition = json.loads(document)
+            except ValueError:
+                continue
+            if edition.get('type', {}).get('key', '/type/edition') != '/type/edition':
+                continue
+            isbns, details = open_library_record(edition)
+            for isbn in isbns:
+                yield isbn, details
+
+
+def read_csv_export(path):
+    # A collection exported from the window (or its CSV snapshot).
+    for book in read_books_csv(path):
+        isbn = to_isbn13(book['isbn'] or '')
+        if isbn:
+            yield isbn, book['details']
+
+
+def read_input(path):
+    name = path[:-3] if path.endswith('.gz') else path
+    if name.endswith('.csv'):
+        return read_csv_export(path)
+    return read_open_library_dump(path)
+
+
+def _write_run(directory, lines):
+    # The sort is stable, so within a run earlier inputs stay first.
+    lines.sort(key=lambda line: line[:KEY_SIZE])
+    run = tempfile.NamedTemporaryFile('w', dir=directory, suffix='.run', delete=False, encoding='utf-8', newline='\n')
+    with run:
+        run.writelines(lines)
+    return run.name
+
+
+def build_index(inputs, path=DEFAULT_INDEX_PATH, run_size=RUN_SIZE, fence_interval=FENCE_INTERVAL, progress=None):
+    # Streams (isbn13, details) pairs from the input files into sorted runs
+    # on disk, merges the runs into a new index at `path` and returns
+    # (records read, ISBNs indexed). When an ISBN appears more than once the
+    # first record read wins, so list preferred sources first.
+    directory = os.path.dirname(os.path.abspath(path))
+    temp_path = path + '.tmp'
+    read = 0
+    with tempfile.TemporaryDirectory(dir=directory, prefix='offline_index_') as runs_directory:
+        runs = []
+        lines = []
+        for input_path in inputs:
+            for isbn, details in read_input(input_path):
+                lines.append(f"{isbn}\t{_record(details)}\n")
+                read += 1
+                if len(lines) >= run_size:
+                    runs.append(_write_run(runs_directory, lines))
+                    lines = []
+                    if progress:
+                        progress(read)
+        if lines:
+            runs.append(_write_run(runs_directory, lines))
+        lines = None
+
+        count = 0
+        fence = []
+        entries_path = os.path.join(runs_directory, 'entries')
+        run_files = [open(run, 'r', encoding='utf-8', newline='\n') for run in runs]
+        try:
+            with open(temp_path, 'wb') as index, open(entries_path, 'wb') as entries:
+                index.write(HEADER.pack(MAGIC, 1, fence_interval, 0, HEADER.size, 0, 0))
+                offset = HEADER.size
+                previous = None
+                for line in heapq.merge(*run_files, key=lambda line: line[:KEY_SIZE]):
+                    key = line[:KEY_SIZE]
+                    if key == previous:
+                        continue
+                    previous = key
+                    record = line[KEY_SIZE + 1:-1].encode('utf-8')
+                    index.write(record)
+                    entries.write(ENTRY.pack(key.encode('ascii'), offset, len(record)))
+                    if count % fence_interval == 0:
+                        fence.append(key.encode('ascii'))
+                    offset += len(record)
+                    count += 1
+
+            with open(temp_path, 'r+b') as index, open(entries_path, 'rb') as entries:
+                index.seek(offset)
+                shutil.copyfileobj(entries, index)
+                fence_offset = index.tell()
+                index.write(b''.join(fence))
+                index.seek(0)
+                index.write(HEADER.pack(MAGIC, 1, fence_interval, count, HEADER.size, offset, fence_offset))
+                index.flush()
+                os.fsync(index.fileno())
+        finally:
+            for run_file in run_files:
+                run_file.close()
+    os.replace(temp_path, path)
+    return read, count
+
+
+_offline_index = None
+_offline_index_checked = False
+_offline_index_lock = threading.Lock()
+
+
+def get_offline_index():
+    # The index at DEFAULT_INDEX_PATH, or None when none has been built.
+    global _offline_index, _offline_index_checked
+    with _offline_index_lock:
+        if not _offline_index_checked:
+            _offline_index_checked = True
+            if os.path.exists(DEFAULT_INDEX_PATH):
+                try:
+                    _offline_index = OfflineIndex(DEFAULT_INDEX_PATH)
+                except (IOError, OSError, ValueError) as e:
+                    print(f"Error opening offline index: {e}")
+        return _offline_index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or query the offline ISBN index.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build', help="ingest catalog dumps into a new index")
+    build.add_argument('inputs', nargs='+', help="Open Library editions dumps (.txt/.gz) or CSV exports (.csv), preferred first")
+    build.add_argument('-o', '--output', default=DEFAULT_INDEX_PATH, help="index file (default: %(default)s)")
+    build.add_argument('--run-size', type=int, default=RUN_SIZE, help="records sorted in memory at a time")
+
+    lookup = subparsers.add_parser('lookup', help="look up ISBNs in an index")
+    lookup.add_argument('isbns', nargs='+')
+    lookup.add_argument('-i', '--index', default=DEFAULT_INDEX_PATH, help="index file (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        started = time.perf_counter()
+        read, count = build_index(
+            args.inputs, args.output, args.run_size,
+            progress=lambda read: print(f"{read} records read...", file=sys.stderr)
+        )
+        print(f"Indexed {count} ISBNs from {read} records in {time.perf_counter() - started:.1f} s", file=sys.stderr)
+        return 0
+
+    index = OfflineIndex(args.index)
+    try:
+        for isbn in args.isbns:
+            isbn_13 = to_isbn13(isbn)
+            print(json.dumps({'isbn': isbn, 'details': index.get(isbn_13) if isbn_13 else None}))
+    finally:
+        index.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
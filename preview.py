@@ -0,0 +1,42 @@
+import cv2
+import numpy as np
+from PyQt5.QtGui import QImage, QPixmap
+
+
+class PreviewRenderer:
+    # Scales camera frames down to the preview size and draws the latest
+    # decode overlays, reusing the same resize and RGB buffers from frame to
+    # frame. Only the final QPixmap.fromImage makes a copy.
+    def __init__(self):
+        self.key = None
+        self.scaled = None
+        self.rgb = None
+
+    def render(self, frame, barcodes, width, height):
+        frame_height, frame_width = frame.shape[:2]
+        scale = min(width / frame_width, height / frame_height)
+        size = (max(1, int(frame_width * scale)), max(1, int(frame_height * scale)))
+
+        key = (frame.shape, size)
+        if key != self.key:
+            self.scaled = np.empty((size[1], size[0], 3), dtype=np.uint8)
+            self.rgb = np.empty((size[1], size[0], 3), dtype=np.uint8)
+            self.key = key
+
+        cv2.resize(frame, size, dst=self.scaled, interpolation=cv2.INTER_LINEAR)
+        cv2.cvtColor(self.scaled, cv2.COLOR_BGR2RGB, dst=self.rgb)
+
+        # Overlays come from the most recent decode result, which may lag the
+        # preview by a frame or two.
+        for barcode in barcodes:
+            (x, y, w, h) = (int(value * scale) for value in barcode.rect)
+            cv2.rectangle(self.rgb, (x, y), (x + w, y + h), (0, 255, 0), 2)
+
+            if barcode.type != "EAN13":
+                continue
+
+            text = f"{barcode.data.decode('utf-8')} ({barcode.type})"
+            cv2.putText(self.rgb, text, (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+
+        image = QImage(self.rgb.data, size[0], size[1], self.rgb.strides[0], QImage.Format_RGB888)
+        return QPixmap.fromImage(image)
@@ -0,0 +1,72 @@
+import time
+from collections import namedtuple
+
+from isbn import is_valid_isbn13
+
+
+ScanEvent = namedtuple('ScanEvent', ['isbn', 'status'])
+
+
+class ScanEventFilter:
+    # Turns the stream of per-frame decodes into one event per physical scan.
+    # A code is confirmed after `required_reads` reads within `read_window`
+    # seconds; it then stays quiet for as long as it keeps being seen, and is
+    # only re-armed once it has been out of view for `cooldown` seconds.
+    # Only fresh decodes count as reads: results repeated for an unchanged
+    # frame (fresh=False) keep codes in view and their reads current, but
+    # never add a read. Events are "new", "duplicate" (is_known(isbn) is
+    # true) or "invalid" (not an ISBN / bad check digit).
+    def __init__(self, is_known=None, required_reads=3, read_window=1.0, cooldown=2.0):
+        self.is_known = is_known or (lambda isbn: False)
+        self.required_reads = required_reads
+        self.read_window = read_window
+        self.cooldown = cooldown
+        self.candidates = {}
+        self.last_seen = {}
+
+    def update(self, isbns, now=None, fresh=True):
+        now = time.monotonic() if now is None else now
+        self._expire(now)
+
+        events = []
+        for isbn in set(isbns):
+            if isbn in self.last_seen:
+                self.last_seen[isbn] = now
+                continue
+
+            if not fresh:
+                # Nothing has changed since the reads were taken, so the
+                # time the frame stood still does not count against them.
+                if isbn in self.candidates:
+                    self.candidates[isbn] = [now] * len(self.candidates[isbn])
+                continue
+
+            reads = self.candidates.setdefault(isbn, [])
+            reads.append(now)
+            if len(reads) < self.required_reads:
+                continue
+
+            del self.candidates[isbn]
+            self.last_seen[isbn] = now
+            events.append(ScanEvent(isbn, self.classify(isbn)))
+        return events
+
+    def classify(self, isbn):
+        if not is_valid_isbn13(isbn):
+            return "invalid"
+        if self.is_known(isbn):
+            return "duplicate"
+        return "new"
+
+    def _expire(self, now):
+        for isbn, reads in list(self.candidates.items()):
+            reads[:] = [read for read in reads if now - read <= self.read_window]
+            if not reads:
+                del self.candidates[isbn]
+        for isbn, seen in list(self.last_seen.items()):
+            if now - seen > self.cooldown:
+                del self.last_seen[isbn]
+
+    def reset(self):
+        self.candidates.clear()
+        self.last_seen.clear()
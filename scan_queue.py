@@ -0,0 +1,209 @@
+import random
+import sqlite3
+import threading
+import time
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from lookup_service import lookup_book_details
+from metrics import METRICS
+
+
+DEFAULT_QUEUE_PATH = 'assets/data/scan_queue.db'
+
+# Title of a scanned book whose details have not arrived yet.
+PENDING_TITLE = "Pending lookup"
+
+
+def pending_details():
+    return {
+        'Title': PENDING_TITLE,
+        'Author': 'N/A',
+        'Publisher': 'N/A',
+        'Edition': 'N/A',
+        'Description': 'N/A',
+        'Pages': 'N/A',
+        'Genre': 'N/A',
+        'Language': 'N/A'
+    }
+
+
+class ScanQueue:
+    # Durable queue of scanned ISBNs still waiting for their details, in a
+    # small SQLite database so pending scans survive a restart. Each entry
+    # remembers how often it was tried and when it may be tried next.
+    def __init__(self, path=DEFAULT_QUEUE_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS queue (
+                isbn TEXT PRIMARY KEY,
+                source TEXT NOT NULL,
+                queued_at REAL NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt REAL NOT NULL,
+                last_error TEXT
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS queue_next_attempt ON queue (next_attempt)")
+        self.conn.commit()
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM queue").fetchone()[0]
+
+    def __contains__(self, isbn):
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM queue WHERE isbn = ?", (isbn,)).fetchone() is not None
+
+    def add(self, isbn, source="SCANNED"):
+        # Returns False if the ISBN is already queued.
+        now = time.time()
+        with self.lock, self.conn:
+            cursor = self.conn.execute(
+                "INSERT OR IGNORE INTO queue (isbn, source, queued_at, next_attempt) VALUES (?, ?, ?, ?)",
+                (isbn, source, now, now)
+            )
+        return cursor.rowcount > 0
+
+    def due(self, limit=16, now=None):
+        # [(isbn, source, attempts, queued_at)] that may be tried now, the
+        # longest waiting first.
+        now = time.time() if now is None else now
+        with self.lock:
+            return self.conn.execute(
+                "SELECT isbn, source, attempts, queued_at FROM queue WHERE next_attempt <= ? "
+                "ORDER BY next_attempt, queued_at LIMIT ?",
+                (now, limit)
+            ).fetchall()
+
+    def next_attempt(self):
+        # Time of the earliest next attempt, or None when the queue is empty.
+        with self.lock:
+            return self.conn.execute("SELECT MIN(next_attempt) FROM queue").fetchone()[0]
+
+    def defer(self, isbn, delay, error=None):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE queue SET attempts = attempts + 1, next_attempt = ?, last_error = ? WHERE isbn = ?",
+                (time.time() + delay, error, isbn)
+            )
+
+    def retry_now(self):
+        # Makes every entry due, e.g. once the network is back.
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE queue SET next_attempt = ?", (time.time(),))
+
+    def remove(self, isbn):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM queue WHERE isbn = ?", (isbn,))
+
+    def clear(self):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM queue")
+
+    def stats(self):
+        with self.lock:
+            size, attempts, oldest = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(attempts), 0), MIN(queued_at) FROM queue"
+            ).fetchone()
+        return {
+            'pending': size,
+            'attempts': attempts,
+            'oldest_seconds': time.time() - oldest if oldest else 0.0
+        }
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class QueueResolver(QThread):
+    # Drains a ScanQueue in the background. Each due entry is looked up once
+    # (the providers' token buckets pace the requests); found and not-found
+    # answers are reported through resolved(isbn, book_details or None,
+    # source) and leave the queue, while a failed lookup (offline, rate
+    # limited, server error) is put back with exponential backoff. After a
+    # failure the whole queue waits out that backoff, which grows with
+    # consecutive failures, so an outage costs one request per interval
+    # rather than one per pending scan.
+    resolved = pyqtSignal(str, object, str)
+    deferred = pyqtSignal(str, int, float)
+
+    def __init__(self, queue, base_backoff=5.0, max_backoff=300.0, lookup=lookup_book_details, parent=None):
+        super().__init__(parent)
+        self.queue = queue
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.lookup = lookup
+        self.wake_event = threading.Event()
+        self.stop_event = threading.Event()
+        self.paused_until = 0.0
+        self.failures = 0
+
+    def wake(self):
+        self.wake_event.set()
+
+    def retry_now(self):
+        self.paused_until = 0.0
+        self.failures = 0
+        self.queue.retry_now()
+        self.wake()
+
+    def backoff(self, attempts):
+        # Full jitter keeps scanners that went offline together from
+        # retrying in lockstep.
+        return min(self.max_backoff, self.base_backoff * 2 ** min(attempts, 16)) * random.uniform(0.5, 1.0)
+
+    def run(self):
+        while not self.stop_event.is_set():
+            now = time.time()
+            entries = self.queue.due() if now >= self.paused_until else []
+            for isbn, source, attempts, queued_at in entries:
+                if self.stop_event.is_set() or not self._resolve(isbn, source, attempts, queued_at):
+                    break
+
+            self.wake_event.clear()
+            if entries and time.time() >= self.paused_until:
+                continue
+            self.wake_event.wait(self._idle_time())
+
+    def _resolve(self, isbn, source, attempts, queued_at):
+        # Returns False when the queue should pause.
+        try:
+            book_details, failed = self.lookup(isbn)
+        except Exception as e:
+            METRICS.inc('errors_total', stage='lookup')
+            print(f"Error looking up queued {isbn}: {e}")
+            book_details, failed = None, True
+
+        if failed and not book_details:
+            self.failures += 1
+            delay = self.backoff(max(attempts, self.failures - 1))
+            self.queue.defer(isbn, delay, "lookup failed")
+            self.paused_until = time.time() + delay
+            METRICS.inc('queue_resolutions_total', result='retry')
+            self.deferred.emit(isbn, attempts + 1, delay)
+            return False
+
+        self.paused_until = 0.0
+        self.failures = 0
+        self.queue.remove(isbn)
+        METRICS.inc('queue_resolutions_total', result='found' if book_details else 'not_found')
+        METRICS.observe('queue_wait_seconds', time.time() - queued_at)
+        self.resolved.emit(isbn, book_details, source)
+        return True
+
+    def _idle_time(self):
+        # Sleeps until the next entry or the end of a pause, whichever is
+        # later; add() and retry_now() wake the thread early.
+        next_attempt = self.queue.next_attempt()
+        if next_attempt is None:
+            return None
+        return max(0.0, min(max(next_attempt, self.paused_until) - time.time(), self.max_backoff))
+
+    def stop(self):
+        self.stop_event.set()
+        self.wake_event.set()
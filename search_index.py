@@ -0,0 +1,277 @@
+import re
+from array import array
+from bisect import bisect_left, insort
+
+
+# numpy is imported by the methods that need it, the first time a search or
+# facet count runs, so it stays off the window's cold-start path.
+
+SEARCH_FIELDS = ('Title', 'Author', 'Publisher', 'Genre')
+FACET_FIELDS = ('Author', 'Publisher', 'Genre')
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Buffered changes up to this many are applied to a SortedKeys list one by
+# one (bisect); beyond it the list is rebuilt and re-sorted in one go.
+MERGE_IN_PLACE = 256
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class SortedKeys:
+    # Sorted list of strings for prefix range queries (a flattened prefix
+    # trie). Additions and removals are buffered and merged on the next query,
+    # so loading or importing a large collection is not an insort per book.
+    def __init__(self):
+        self.keys = []
+        self.added = []
+        self.removed = set()
+
+    def add(self, key):
+        if key in self.removed:
+            # Removed since the last merge, so it is still listed.
+            self.removed.discard(key)
+            return
+        self.added.append(key)
+
+    def remove(self, key):
+        self.removed.add(key)
+
+    def clear(self):
+        self.keys = []
+        self.added = []
+        self.removed = set()
+
+    def prefix(self, prefix):
+        start, end = self.prefix_range(prefix)
+        return self.keys[start:end]
+
+    def prefix_range(self, prefix):
+        # (start, end) of the keys starting with `prefix` in self.keys.
+        self._merge()
+        start = bisect_left(self.keys, prefix)
+        end = bisect_left(self.keys, prefix + '\uffff', start)
+        return start, end
+
+    def _merge(self):
+        if self.removed:
+            added = [key for key in self.added if key not in self.removed]
+            if len(self.removed) <= MERGE_IN_PLACE:
+                for key in self.removed:
+                    position = bisect_left(self.keys, key)
+                    if position < len(self.keys) and self.keys[position] == key:
+                        del self.keys[position]
+            else:
+                self.keys = [key for key in self.keys if key not in self.removed]
+            self.added = added
+            self.removed = set()
+        if self.added:
+            if len(self.added) <= MERGE_IN_PLACE:
+                for key in self.added:
+                    insort(self.keys, key)
+            else:
+                self.keys.extend(self.added)
+                self.keys.sort()
+            self.added = []
+
+
+class SearchResults:
+    # Matching ISBNs in collection order, as a read-only sequence. Rows are
+    # only turned into ISBNs when asked for, so a list view over a large
+    # result set formats just the rows on screen.
+    def __init__(self, index, ids):
+        self.index = index
+        self.ids = ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, row):
+        return self.index.docs[self.ids[row]]
+
+    def __iter__(self):
+        docs = self.index.docs
+        return (docs[doc] for doc in self.ids.tolist())
+
+
+class SearchIndex:
+    # In-memory search over a BookCollection. Each book gets a document id in
+    # the order it was added; `fields` are tokenized into an inverted index
+    # (token -> set of document ids), ISBNs are kept sorted for prefix
+    # queries, and each facet field is a column of value codes so filters and
+    # facet counts are numpy operations on the matching ids. The last word of
+    # a query matches as a prefix so results narrow while typing. Kept up to
+    # date by BookCollection on add, update, remove and clear.
+    def __init__(self, fields=SEARCH_FIELDS, facet_fields=FACET_FIELDS):
+        self.fields = fields
+        self.facet_fields = facet_fields
+        self.clear()
+
+    def clear(self):
+        self.docs = []
+        self.doc_of = {}
+        self.isbns = SortedKeys()
+        self.tokens = SortedKeys()
+        self.postings = {}
+        # Code 0 is "no book" (a removed document).
+        self.codes = {field: array('i') for field in self.facet_fields}
+        self.values = {field: [None] for field in self.facet_fields}
+        self.value_codes = {field: {} for field in self.facet_fields}
+
+    def add(self, book):
+        isbn = book['isbn']
+        doc = self.doc_of.get(isbn)
+        if doc is None:
+            # Only an update (remove with keep_position) reuses a document
+            # id; a book that is added again goes to the end, as it does in
+            # the collection.
+            doc = self.doc_of[isbn] = len(self.docs)
+            self.docs.append(isbn)
+            for field in self.facet_fields:
+                self.codes[field].append(0)
+        self.docs[doc] = isbn
+        self.isbns.add(isbn)
+
+        for token in self._book_tokens(book):
+            docs = self.postings.get(token)
+            if docs is None:
+                docs = self.postings[token] = set()
+                self.tokens.add(token)
+            docs.add(doc)
+
+        for field in self.facet_fields:
+            value = book['details'].get(field)
+            code = self.value_codes[field].get(value)
+            if code is None:
+                code = self.value_codes[field][value] = len(self.values[field])
+                self.values[field].append(value)
+            self.codes[field][doc] = code
+
+    def remove(self, book, keep_position=False):
+        doc = self.doc_of.get(book['isbn'])
+        if doc is None or self.docs[doc] is None:
+            return
+        self.docs[doc] = None
+        if not keep_position:
+            del self.doc_of[book['isbn']]
+        self.isbns.remove(book['isbn'])
+
+        for token in self._book_tokens(book):
+            docs = self.postings.get(token)
+            if docs is None:
+                continue
+            docs.discard(doc)
+            if not docs:
+                del self.postings[token]
+                self.tokens.remove(token)
+
+        for field in self.facet_fields:
+            self.codes[field][doc] = 0
+
+    def _book_tokens(self, book):
+        tokens = set()
+        for field in self.fields:
+            value = book['details'].get(field)
+            if value and value != 'N/A':
+                tokens.update(tokenize(value))
+        return tokens
+
+    def search(self, text, filters=None):
+        # SearchResults for a search box query narrowed by exact facet
+        # `filters` ({field: value}), or None when there is neither (every
+        # book matches).
+        docs = self._match(text)
+        if docs is None and not filters:
+            return None
+
+        import numpy as np
+
+        if docs is None:
+            ids = None
+        else:
+            ids = np.fromiter(docs, dtype=np.int64, count=len(docs))
+            ids.sort()
+
+        for field, value in (filters or {}).items():
+            column = self._column(field)
+            code = self.value_codes[field].get(value, -1)
+            if ids is None:
+                ids = np.flatnonzero(column == code)
+            else:
+                ids = ids[column[ids] == code]
+        return SearchResults(self, ids)
+
+    def _match(self, text):
+        # A query of digits is also an ISBN prefix, but titles such as "1984"
+        # and other numeric words still match through the token index.
+        words = tokenize(text)
+        compact = text.replace('-', '').replace(' ', '').strip()
+        isbn_docs = None
+        if compact and compact.isdigit():
+            isbn_docs = {self.doc_of[isbn] for isbn in self.isbns.prefix(compact)}
+
+        if not words:
+            return isbn_docs
+        docs = self._match_words(words)
+        return docs if isbn_docs is None else docs | isbn_docs
+
+    def _match_words(self, words):
+        # Exact words first, smallest posting list first, then the prefix.
+        sets = []
+        for word in words[:-1]:
+            docs = self.postings.get(word)
+            if not docs:
+                return set()
+            sets.append(docs)
+        sets.sort(key=len)
+
+        matches = set(sets[0]) if sets else None
+        for docs in sets[1:]:
+            matches &= docs
+            if not matches:
+                return matches
+        return self._match_prefix(words[-1], matches)
+
+    def _match_prefix(self, prefix, within):
+        start, end = self.tokens.prefix_range(prefix)
+        tokens = self.tokens.keys[start:end]
+        if within is None:
+            return set().union(*(self.postings[token] for token in tokens))
+
+        matches = set()
+        for token in tokens:
+            matches |= within & self.postings[token]
+            if len(matches) == len(within):
+                break
+        return matches
+
+    def _column(self, field):
+        import numpy as np
+        return np.frombuffer(self.codes[field], dtype=np.int32)
+
+    def facet_counts(self, ids=None, top=10):
+        # {field: [(value, count), ...]}, most common first, over the
+        # documents `ids` (all of them when None).
+        import numpy as np
+
+        facets = {}
+        for field in self.facet_fields:
+            column = self._column(field)
+            codes = column if ids is None else column[ids]
+            counts = np.bincount(codes, minlength=len(self.values[field]))
+            counts[0] = 0
+            missing = self.value_codes[field].get('N/A')
+            if missing is not None:
+                counts[missing] = 0
+
+            found = np.count_nonzero(counts)
+            if not found:
+                facets[field] = []
+                continue
+            best = min(top, found)
+            codes = np.argpartition(counts, -best)[-best:]
+            codes = codes[np.argsort(-counts[codes], kind='stable')]
+            facets[field] = [(self.values[field][code], int(counts[code])) for code in codes.tolist()]
+        return facets
@@ -0,0 +1,66 @@
+import importlib
+import time
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from collection import BookCollection
+from storage import PAGE_SIZE, open_store
+
+
+class StartupTimer:
+    # Records named points in time relative to `started` (the process start,
+    # as measured by main.py) for the --startup-timing report.
+    def __init__(self, started):
+        self.started = started
+        self.marks = []
+
+    def mark(self, name):
+        self.marks.append((name, time.perf_counter() - self.started))
+
+    def report(self):
+        lines = ["Startup timing:"]
+        previous = 0.0
+        for name, elapsed in self.marks:
+            lines.append(f"  {name:<28} {elapsed * 1000:8.1f} ms  (+{(elapsed - previous) * 1000:.1f} ms)")
+            previous = elapsed
+        return "\n".join(lines)
+
+
+class StartupThread(QThread):
+    # Does the slow parts of startup after the window is already visible:
+    # importing OpenCV/pyzbar and requests, then opening the store and loading
+    # the first page of the collection; the window pages in the rest. The
+    # camera is started as soon as its modules are in, so the first frame
+    # does not wait for the collection.
+    progress = pyqtSignal(str)
+    camera_support_ready = pyqtSignal()
+    collection_loaded = pyqtSignal(object, object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, timer, search_fields=(), facet_fields=(), parent=None):
+        super().__init__(parent)
+        self.timer = timer
+        self.search_fields = search_fields
+        self.facet_fields = facet_fields
+
+    def run(self):
+        try:
+            self.progress.emit("Loading camera support...")
+            for module in ("decoding", "capture", "preview"):
+                importlib.import_module(module)
+            self.timer.mark("camera modules imported")
+            self.camera_support_ready.emit()
+
+            self.progress.emit("Loading lookup support...")
+            importlib.import_module("book_api")
+            self.timer.mark("lookup modules imported")
+
+            self.progress.emit("Loading collection...")
+            store = open_store()
+            collection = BookCollection(search_fields=self.search_fields, facet_fields=self.facet_fields)
+            store.load(collection, limit=PAGE_SIZE)
+            self.timer.mark("first books loaded")
+            self.collection_loaded.emit(store, collection)
+        except Exception as e:
+            print(f"Error during startup: {e}")
+            self.failed.emit(str(e))
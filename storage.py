@@ -0,0 +1,405 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from collection import Book, BookCollection, CSV_FIELDNAMES, row_from_book, read_books_csv, write_books_csv
+from metrics import METRICS
+
+
+SNAPSHOT_PATH = 'assets/data/scanned_books.csv'
+DATABASE_PATH = 'assets/data/scanned_books.db'
+
+# Storage backend used by open_store(): "sqlite" or "csv".
+STORAGE_BACKEND = "sqlite"
+
+# Books read per load_more() call when a store is loaded a page at a time.
+PAGE_SIZE = 1000
+
+
+class JournaledStore:
+    # Persists the collection as a CSV snapshot plus an append-only journal of
+    # add/update/delete/clear records (one JSON object per line). Each change
+    # costs one short append; the journal is fsync'd every `fsync_batch`
+    # records or `fsync_interval` seconds, and once it holds
+    # `compact_threshold` records it is folded back into the snapshot on a
+    # background thread.
+    def __init__(self, snapshot_path=SNAPSHOT_PATH, journal_path=None, fsync_batch=16, fsync_interval=1.0, compact_threshold=1000):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path or os.path.splitext(snapshot_path)[0] + '.journal'
+        self.compacting_path = self.journal_path + '.compacting'
+        self.fsync_batch = fsync_batch
+        self.fsync_interval = fsync_interval
+        self.compact_threshold = compact_threshold
+
+        self.lock = threading.Lock()
+        self.journal = None
+        self.pending = 0
+        self.records = 0
+        self.compaction = None
+        self.stop_event = threading.Event()
+        self.flusher = None
+
+    def load(self, collection, limit=None):
+        # The snapshot is always read whole; `limit` is accepted for the
+        # SQLiteStore interface, and load_more() never has anything left.
+        interrupted = self.read(collection)
+
+        self.journal = open(self.journal_path, 'a', encoding='utf-8')
+        self.flusher = threading.Thread(target=self._flush_loop, name="journal-flush", daemon=True)
+        self.flusher.start()
+
+        # A compaction was cut short; fold both journals in right away so the
+        # next rotation cannot overwrite records missing from the snapshot.
+        if interrupted:
+            self.compact(collection, wait=True)
+
+    def read(self, collection):
+        # Reads the snapshot and journals into `collection` without opening
+        # the journal for writing. Returns whether a compaction was cut short.
+        try:
+            for book in read_books_csv(self.snapshot_path):
+                collection.add(book['isbn'], book['details'], book['timestamp'])
+        except FileNotFoundError:
+            pass
+
+        interrupted = os.path.exists(self.compacting_path)
+        if interrupted:
+            self._replay(self.compacting_path, collection)
+        self.records = self._replay(self.journal_path, collection)
+        return interrupted
+
+    def loading(self):
+        return False
+
+    def load_more(self, collection, limit=PAGE_SIZE):
+        return []
+
+    def _replay(self, path, collection):
+        count = 0
+        offset = 0
+        try:
+            with open(path, 'rb') as journal:
+                for line in journal:
+                    try:
+                        if not line.endswith(b'\n'):
+                            raise ValueError("missing newline")
+                        record = json.loads(line)
+                    except ValueError:
+                        # Only the last record can be torn by a crash; cut it
+                        # off so new records do not get appended to it.
+                        print(f"Ignoring incomplete journal record in {path}")
+                        os.truncate(path, offset)
+                        break
+                    self._apply(collection, record)
+                    offset += len(line)
+                    count += 1
+        except FileNotFoundError:
+            pass
+        return count
+
+    def _apply(self, collection, record):
+        op = record['op']
+        if op == 'add':
+            book = record['book']
+            collection.remove(book['isbn'])
+            collection.add(book['isbn'], book['details'], book['timestamp'])
+        elif op == 'update':
+            collection.update(record['isbn'], record['details'])
+        elif op == 'delete':
+            collection.remove(record['isbn'])
+        elif op == 'clear':
+            collection.clear()
+
+    def record_add(self, book):
+        self._append({'op': 'add', 'book': book.to_dict()})
+
+    def record_update(self, isbn, details):
+        self._append({'op': 'update', 'isbn': isbn, 'details': dict(details)})
+
+    def record_delete(self, isbn):
+        self._append({'op': 'delete', 'isbn': isbn})
+
+    def record_clear(self):
+        self._append({'op': 'clear'})
+
+    def _append(self, record):
+        started = time.perf_counter()
+        line = json.dumps(record) + '\n'
+        try:
+            with self.lock:
+                self.journal.write(line)
+                self.journal.flush()
+                self.pending += 1
+                self.records += 1
+                if self.pending >= self.fsync_batch:
+                    self._fsync()
+        except (IOError, OSError) as e:
+            METRICS.inc('errors_total', stage='persistence')
+            print(f"Error writing journal: {e}")
+        METRICS.observe('persistence_seconds', time.perf_counter() - started, operation=record['op'])
+
+    def _fsync(self):
+        if self.pending:
+            with METRICS.timer('persistence_seconds', operation='fsync'):
+                os.fsync(self.journal.fileno())
+            self.pending = 0
+
+    def _flush_loop(self):
+        while not self.stop_event.wait(self.fsync_interval):
+            try:
+                with self.lock:
+                    self._fsync()
+            except (IOError, OSError) as e:
+                METRICS.inc('errors_total', stage='persistence')
+                print(f"Error syncing journal: {e}")
+
+    def maybe_compact(self, collection):
+        if self.records >= self.compact_threshold and not self.is_compacting():
+            self.compact(collection)
+
+    def is_compacting(self):
+        return self.compaction is not None and self.compaction.is_alive()
+
+    def compact(self, collection, wait=False):
+        if self.is_compacting():
+            self.compaction.join()
+
+        # Entries are copied on the calling thread, since updates change
+        # books in place.
+        books = [book.to_dict() for book in collection]
+
+        with self.lock:
+            self._fsync()
+            self.journal.close()
+            if os.path.exists(self.compacting_path):
+                # The previous compaction failed; keep its records too.
+                with open(self.journal_path, 'r', encoding='utf-8') as journal, \
+                        open(self.compacting_path, 'a', encoding='utf-8') as compacting:
+                    compacting.write(journal.read())
+                os.remove(self.journal_path)
+            else:
+                os.replace(self.journal_path, self.compacting_path)
+            self.journal = open(self.journal_path, 'a', encoding='utf-8')
+            self.records = 0
+
+        self.compaction = threading.Thread(target=self._write_snapshot, args=(books,), name="journal-compact")
+        self.compaction.start()
+        if wait:
+            self.compaction.join()
+
+    def _write_snapshot(self, books):
+        started = time.perf_counter()
+        temp_path = self.snapshot_path + '.tmp'
+        try:
+            write_books_csv(temp_path, books)
+            with open(temp_path, 'rb+') as snapshot:
+                os.fsync(snapshot.fileno())
+            os.replace(temp_path, self.snapshot_path)
+            os.remove(self.compacting_path)
+        except (IOError, OSError) as e:
+            METRICS.inc('errors_total', stage='persistence')
+            print(f"Error compacting scanned books: {e}")
+        METRICS.observe('persistence_seconds', time.perf_counter() - started, operation='snapshot')
+
+    def rewrite(self, collection):
+        with METRICS.timer('persistence_seconds', operation='rewrite'):
+            self.compact(collection, wait=True)
+
+    def close(self):
+        self.stop_event.set()
+        if self.is_compacting():
+            self.compaction.join()
+        if self.journal:
+            with self.lock:
+                self._fsync()
+                self.journal.close()
+                self.journal = None
+
+
+class SQLiteStore:
+    # Keeps the collection in a SQLite database in WAL mode, with the ISBN as
+    # primary key; searching is done by the collection in memory. It
+    # implements the same interface as JournaledStore, so the window does not
+    # care which one it talks to. On first use an existing CSV
+    # snapshot/journal is migrated into the database. Descriptions are left
+    # in the database on load and read back one at a time when shown. Books
+    # can be loaded a page at a time, so opening a large collection does not
+    # have to wait for all of it.
+    def __init__(self, path=DATABASE_PATH, snapshot_path=SNAPSHOT_PATH, batch_size=1000):
+        self.path = path
+        self.snapshot_path = snapshot_path
+        self.batch_size = batch_size
+
+        # The store is opened and loaded on the startup thread and then used
+        # from the GUI thread, never from both at once.
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        columns = ", ".join(f"{name} TEXT" for name in CSV_FIELDNAMES[1:])
+        self.conn.execute(f"CREATE TABLE IF NOT EXISTS books (isbn TEXT PRIMARY KEY, {columns})")
+        # Databases from earlier versions have secondary indexes that no
+        # query uses any more; they only slow down writes.
+        for index in ('books_title', 'books_author', 'books_timestamp'):
+            self.conn.execute(f"DROP INDEX IF EXISTS {index}")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.conn.commit()
+
+        placeholders = ", ".join("?" for _ in CSV_FIELDNAMES)
+        self.insert_sql = f"INSERT OR REPLACE INTO books ({', '.join(CSV_FIELDNAMES)}) VALUES ({placeholders})"
+
+        # Rowid of the last book handed to the collection while paging, or
+        # None once every book is loaded.
+        self.loaded_rowid = None
+
+    def load(self, collection, limit=None):
+        # Adds the stored books to `collection` in the order they were added.
+        # With `limit`, only that many are read now and load_more() pages in
+        # the rest; until then the collection asks the database about the
+        # books it does not have yet, so duplicates are still caught.
+        if self._get_meta('migrated') is None:
+            self._migrate_csv()
+
+        collection.description_loader = self.description
+        self.loaded_rowid = 0
+        collection.unloaded = self._unloaded
+        self.load_more(collection, limit or self.batch_size)
+        while self.loading() and not limit:
+            self.load_more(collection, self.batch_size)
+
+    def loading(self):
+        return self.loaded_rowid is not None
+
+    def load_more(self, collection, limit=PAGE_SIZE):
+        # Loads the next `limit` books and returns their ISBNs; an empty list
+        # means the whole collection is loaded.
+        if self.loaded_rowid is None:
+            return []
+
+        rows = self.conn.execute(
+            "SELECT rowid, isbn, title, author, publisher, publish_date, pages, genre, language, timestamp "
+            "FROM books WHERE rowid > ? ORDER BY rowid LIMIT ?",
+            (self.loaded_rowid, limit)
+        ).fetchall()
+        added = []
+        for rowid, isbn, title, author, publisher, publish_date, pages, genre, language, timestamp in rows:
+            book = collection.add(isbn, {
+                'Title': title,
+                'Author': author,
+                'Publisher': publisher,
+                'Edition': publish_date,
+                'Pages': pages,
+                'Genre': genre,
+                'Language': language
+            }, timestamp)
+            if book is not None:
+                added.append(isbn)
+            self.loaded_rowid = rowid
+
+        if len(rows) < limit:
+            self.loaded_rowid = None
+            collection.unloaded = None
+        return added
+
+    def _unloaded(self, isbn):
+        # Whether `isbn` is stored but not yet paged into the collection.
+        if self.loaded_rowid is None:
+            return False
+        row = self.conn.execute("SELECT 1 FROM books WHERE isbn = ? AND rowid > ?", (isbn, self.loaded_rowid)).fetchone()
+        return row is not None
+
+    def description(self, isbn):
+        try:
+            row = self.conn.execute("SELECT description FROM books WHERE isbn = ?", (isbn,)).fetchone()
+        except sqlite3.Error as e:
+            print(f"Error reading description: {e}")
+            row = None
+        return row[0] if row and row[0] is not None else 'N/A'
+
+    def _migrate_csv(self):
+        # Only reads the CSV files, so no journal is created where there was
+        # none.
+        csv_store = JournaledStore(self.snapshot_path)
+        if os.path.exists(self.snapshot_path) or os.path.exists(csv_store.journal_path):
+            books = BookCollection()
+            csv_store.read(books)
+            self._insert_many(books)
+        self._set_meta('migrated', '1')
+        self.conn.commit()
+
+    def _get_meta(self, key):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def _row_values(self, book):
+        # A description that was never loaded is written as NULL; rewrite()
+        # copies the stored one back in.
+        row = row_from_book(book, with_description=not isinstance(book, Book) or book.has_description())
+        return [None if row[name] is None else str(row[name]) for name in CSV_FIELDNAMES]
+
+    def _insert_many(self, books):
+        batch = []
+        for book in books:
+            batch.append(self._row_values(book))
+            if len(batch) >= self.batch_size:
+                self.conn.executemany(self.insert_sql, batch)
+                batch = []
+        if batch:
+            self.conn.executemany(self.insert_sql, batch)
+
+    def record_add(self, book):
+        self._execute('add', self.insert_sql, self._row_values(book))
+
+    def record_update(self, isbn, details):
+        self._execute(
+            'update',
+            "UPDATE books SET title = ?, author = ?, publisher = ?, publish_date = ?, description = ?, pages = ?, genre = ?, language = ? WHERE isbn = ?",
+            [str(details[key]) for key in ('Title', 'Author', 'Publisher', 'Edition', 'Description', 'Pages', 'Genre', 'Language')] + [isbn]
+        )
+
+    def record_delete(self, isbn):
+        self._execute('delete', "DELETE FROM books WHERE isbn = ?", (isbn,))
+
+    def record_clear(self):
+        self._execute('clear', "DELETE FROM books", ())
+
+    def _execute(self, operation, sql, params):
+        started = time.perf_counter()
+        try:
+            with self.conn:
+                self.conn.execute(sql, params)
+        except sqlite3.Error as e:
+            METRICS.inc('errors_total', stage='persistence')
+            print(f"Error writing scanned books database: {e}")
+        METRICS.observe('persistence_seconds', time.perf_counter() - started, operation=operation)
+
+    def maybe_compact(self, collection):
+        pass
+
+    def rewrite(self, collection):
+        with METRICS.timer('persistence_seconds', operation='rewrite'), self.conn:
+            self.conn.execute("CREATE TEMP TABLE old_descriptions (isbn TEXT PRIMARY KEY, description TEXT)")
+            self.conn.execute("INSERT INTO old_descriptions SELECT isbn, description FROM books")
+            self.conn.execute("DELETE FROM books")
+            self._insert_many(collection)
+            self.conn.execute(
+                "UPDATE books SET description = (SELECT description FROM old_descriptions WHERE old_descriptions.isbn = books.isbn) "
+                "WHERE description IS NULL"
+            )
+            self.conn.execute("DROP TABLE old_descriptions")
+
+    def close(self):
+        self.conn.close()
+
+
+def open_store(backend=None):
+    backend = backend or STORAGE_BACKEND
+    if backend == "sqlite":
+        return SQLiteStore()
+    if backend == "csv":
+        return JournaledStore()
+    raise ValueError(f"Unknown storage backend: {backend}")